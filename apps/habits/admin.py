@@ -1,8 +1,46 @@
 from django.contrib import admin
-from .models import Habit, Goal, HabitLog, Reminder
+from django.contrib.auth import get_user_model
+from apps.users.admin import CustomUserAdmin
+from .deletion import soft_delete_habit, soft_delete_user
+from .models import Habit, Goal, HabitLog, HabitPeriodStat, Reminder
 
+User = get_user_model()
 
-admin.site.register(Habit)
+
+class SoftDeleteAdminMixin:
+    """
+    Delete objects with a soft delete followed by a background purge instead of Django's
+    deletion collector, and skip listing every related row on the confirmation page.
+    """
+    soft_delete = None
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set() if self.has_delete_permission(request) else {
+            self.model._meta.verbose_name
+        }
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+
+@admin.register(Habit)
+class HabitAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete = staticmethod(soft_delete_habit)
+
+
+class SoftDeleteUserAdmin(SoftDeleteAdminMixin, CustomUserAdmin):
+    """The users admin, deleting accounts together with their habits in the background."""
+    soft_delete = staticmethod(soft_delete_user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, SoftDeleteUserAdmin)
 admin.site.register(Goal)
 admin.site.register(HabitLog)
 admin.site.register(Reminder)
+admin.site.register(HabitPeriodStat)
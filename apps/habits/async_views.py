@@ -0,0 +1,124 @@
+"""
+Async versions of the read-heavy habit endpoints, routed instead of the DRF views when
+HABITS_ASYNC_VIEWS is enabled. Under an ASGI server they wait on PostgreSQL through the
+async ORM instead of holding a worker thread per request. Writes on the same URLs are
+delegated to the synchronous DRF views.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from apps.users.authentication import CachedJWTAuthentication
+from .cache import aget_dashboard_cache_key
+from .models import Habit, HabitLog
+from .pagination import AsyncKeysetPagination
+from .serializers import (
+    HabitSerializer, HabitLogSerializer, HabitLogFilterSerializer, HabitDashboardSerializer
+)
+from .views import HabitViewSet, HabitLogListCreateView
+
+DASHBOARD_CHUNK_SIZE = 100
+
+
+async def aauthenticate(request):
+    """
+    Authenticate the request from its JWT bearer token like CachedJWTAuthentication
+    does, loading the user through the async cache and ORM.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+
+    return await authentication.aget_user(authentication.get_validated_token(raw_token))
+
+
+def async_api_view(sync_view):
+    """
+    Turn an async function into an authenticated GET endpoint, run in the user's timezone,
+    that renders DRF exceptions like DRF does. Other methods are handed to `sync_view`.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+            try:
+                request.user = await aauthenticate(request)
+                with timezone.override(request.user.timezone):
+                    return await view(request, *args, **kwargs)
+            except APIException as exc:
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {
+                    'detail': exc.detail
+                }
+                response = JsonResponse(data, status=exc.status_code, safe=False)
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    authentication = CachedJWTAuthentication()
+                    response['WWW-Authenticate'] = authentication.authenticate_header(request)
+                return response
+
+        return wrapper
+    return decorator
+
+
+async def paginated_response(request, queryset, ordering, serializer_class):
+    rows, next_url, previous_url = await AsyncKeysetPagination(ordering).apaginate(
+        request, queryset
+    )
+    return JsonResponse({
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(rows, many=True).data,
+    })
+
+
+@async_api_view(HabitViewSet.as_view({'get': 'dashboard'}))
+async def habit_dashboard(request):
+    """Async version of HabitViewSet.dashboard, with the same cache and ETag handling."""
+    cache_key, etag = await aget_dashboard_cache_key(request.user.id)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+
+    if etag in if_none_match or '*' in if_none_match:
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    data = await cache.aget(cache_key)
+
+    if data is None:
+        habits = [
+            habit async for habit in Habit.objects.filter(user=request.user)
+            .with_dashboard_data()
+            .aiterator(chunk_size=DASHBOARD_CHUNK_SIZE)
+        ]
+        data = HabitDashboardSerializer(habits, many=True).data
+        await cache.aset(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+
+    return JsonResponse(data, safe=False, headers={'ETag': etag})
+
+
+@async_api_view(HabitViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def habit_list(request):
+    """Async version of the habit list, paginated by id, newest first."""
+    queryset = Habit.objects.filter(user=request.user)
+    return await paginated_response(request, queryset, ('-id',), HabitSerializer)
+
+
+@async_api_view(HabitLogListCreateView.as_view())
+async def habit_log_list(request):
+    """Async version of the habit log list with the same filters and ordering."""
+    filters = HabitLogFilterSerializer(data=request.GET)
+    filters.is_valid(raise_exception=True)
+    queryset = HabitLog.objects.filter(
+        user=request.user, habit__deleted_at__isnull=True
+    ).filter_history(**filters.validated_data)
+    return await paginated_response(
+        request, queryset, HabitLogListCreateView.pagination_ordering, HabitLogSerializer
+    )
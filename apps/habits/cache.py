@@ -0,0 +1,66 @@
+import hashlib
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+
+def _dashboard_version_key(user_id):
+    return f'habits:dashboard-version:{user_id}'
+
+
+def get_dashboard_version(user_id):
+    """
+    Return the current dashboard version of the user. Versions are random so
+    an evicted version key never brings an old cache entry or ETag back to life.
+    """
+    key = _dashboard_version_key(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+async def aget_dashboard_version(user_id):
+    """Async version of get_dashboard_version() for the async views."""
+    key = _dashboard_version_key(user_id)
+    version = await cache.aget(key)
+
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+def bump_dashboard_version(user_id):
+    """
+    Give the user a new dashboard version once the current transaction commits. A bump
+    before the commit would let a concurrent read cache the old rows under the new version.
+    """
+    transaction.on_commit(
+        lambda: cache.set(_dashboard_version_key(user_id), uuid.uuid4().hex, timeout=None)
+    )
+
+
+def _dashboard_cache_key(user_id, version):
+    key = f'habits:dashboard:{user_id}:{version}:{timezone.localdate().isoformat()}'
+    etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+    return key, etag
+
+
+def get_dashboard_cache_key(user_id):
+    """
+    Return the cache key and the strong ETag of the user's dashboard. Both change
+    whenever the user's data changes or the day rolls over.
+    """
+    return _dashboard_cache_key(user_id, get_dashboard_version(user_id))
+
+
+async def aget_dashboard_cache_key(user_id):
+    return _dashboard_cache_key(user_id, await aget_dashboard_version(user_id))
@@ -8,3 +8,10 @@ GOAL_STATUS_CHOICES = [
     ('in_progress', 'In Progress'),
     ('completed', 'Completed'),
 ]
+
+PERIOD_FREQUENCIES = ['daily', 'monthly']
+
+ONE_LOG_PER_PERIOD_MESSAGES = {
+    'daily': 'You can only log daily habit once per day.',
+    'monthly': 'You can only log monthly habit once per month.',
+}
@@ -0,0 +1,80 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from .cache import bump_dashboard_version
+from .models import Goal, Habit, HabitLog, HabitPeriodStat, Reminder, ReminderDispatch
+
+# Tables emptied in bounded batches before a purged habit row is deleted, with the lookup
+# of their rows of a habit. Rows are removed with raw DELETEs: their per-row signals only
+# maintain rollups, streaks and caches of the habit that is going away, so skipping them
+# is safe.
+HABIT_CHILD_MODELS = (
+    (HabitLog, 'habit'),
+    (HabitPeriodStat, 'habit'),
+    (Goal, 'habit'),
+    (ReminderDispatch, 'reminder__habit'),
+    (Reminder, 'habit'),
+)
+
+
+def soft_delete_habit(habit):
+    """
+    Hide the habit right away and queue the purge of its rows. Returns immediately
+    no matter how many logs the habit has.
+    """
+    from .tasks import purge_habit
+
+    Habit.all_objects.filter(pk=habit.pk).update(deleted_at=timezone.now())
+    bump_dashboard_version(habit.user_id)
+    transaction.on_commit(lambda: purge_habit.delay(habit.pk))
+
+
+def soft_delete_user(user):
+    """
+    Deactivate the user and hide their habits right away, then queue the purge of
+    the account.
+    """
+    from .tasks import purge_user
+
+    now = timezone.now()
+    user.deleted_at = now
+    user.is_active = False
+    user.save(update_fields=['deleted_at', 'is_active'])
+    Habit.all_objects.filter(user=user, deleted_at__isnull=True).update(deleted_at=now)
+    bump_dashboard_version(user.pk)
+    transaction.on_commit(lambda: purge_user.delay(user.pk))
+
+
+def _delete_batch(model, habit_lookup, habit_id, batch_size):
+    ids = model._base_manager.filter(**{habit_lookup: habit_id}).values('pk')[:batch_size]
+    sql, params = ids.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} WHERE {model._meta.pk.column} IN ({sql})',
+            params,
+        )
+        return cursor.rowcount
+
+
+def purge_habit_rows(habit_id, batch_size, max_batches):
+    """
+    Delete up to `max_batches` batches of `batch_size` rows of a soft-deleted habit,
+    and the habit itself once nothing refers to it anymore.
+
+    Returns (deleted rows, batches used, finished). Every batch commits on its own, so
+    an interrupted purge picks up where it stopped when it is run again.
+    """
+    deleted = 0
+    batches = 0
+
+    for model, habit_lookup in HABIT_CHILD_MODELS:
+        while batches < max_batches:
+            batches += 1
+            rowcount = _delete_batch(model, habit_lookup, habit_id, batch_size)
+            deleted += rowcount
+            if rowcount < batch_size:
+                break
+        else:
+            return deleted, batches, False
+
+    deleted += Habit.all_objects.filter(pk=habit_id, deleted_at__isnull=False).delete()[0]
+    return deleted, batches, True
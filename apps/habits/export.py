@@ -0,0 +1,62 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+EXPORT_FIELDS = (
+    'id', 'user_id', 'habit_id', 'habit_name', 'frequency', 'completed_at', 'period_key'
+)
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """File-like object that hands written lines back to the caller instead of storing them."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=None):
+    """
+    Yield habit log rows joined with their habit as tuples in EXPORT_FIELDS order,
+    oldest first, reading the queryset in chunks so memory use does not grow with
+    the size of the history.
+    """
+    return (
+        queryset.annotate(
+            habit_name=F('habit__name'),
+            frequency=F('habit__frequency'),
+        )
+        .order_by('completed_at', 'id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size or settings.HABIT_LOG_EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if hasattr(value, 'isoformat') else value for value in row
+        )
+
+
+EXPORT_WRITERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+def export_habit_logs(queryset, export_format, chunk_size=None):
+    """Return a generator of NDJSON or CSV lines for the habit logs in the queryset."""
+    return EXPORT_WRITERS[export_format](iter_export_rows(queryset, chunk_size))
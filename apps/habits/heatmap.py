@@ -0,0 +1,86 @@
+import base64
+from datetime import date
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.utils import timezone
+
+
+def get_resolution(frequency):
+    return 'month' if frequency == 'monthly' else 'day'
+
+
+def _heatmap_cache_key(habit_id, resolution, year):
+    return f'habits:heatmap:{habit_id}:{resolution}:{year}'
+
+
+def build_year_heatmap(habit, year):
+    """
+    Return the habit's completions in `year` as a bitset with one bit per day
+    (one per month for monthly habits), built from a single aggregate over the
+    daily rollup. Bit i lives in byte i // 8 under mask 1 << (i % 8).
+
+    Past years can no longer change, so they are cached without expiry.
+    """
+    resolution = get_resolution(habit.frequency)
+    cache_key = _heatmap_cache_key(habit.id, resolution, year)
+    is_past_year = year < timezone.localdate().year
+
+    if is_past_year:
+        heatmap = cache.get(cache_key)
+        if heatmap is not None:
+            return heatmap
+
+    completed_days = habit.period_stats.filter(
+        period__gte=date(year, 1, 1),
+        period__lt=date(year + 1, 1, 1),
+        completions__gt=0,
+    ).aggregate(days=ArrayAgg('period'))['days'] or []
+
+    if resolution == 'month':
+        length = 12
+        indexes = {day.month - 1 for day in completed_days}
+    else:
+        length = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+        indexes = {(day - date(year, 1, 1)).days for day in completed_days}
+
+    bits = bytearray(-(-length // 8))
+    for index in indexes:
+        bits[index // 8] |= 1 << (index % 8)
+
+    heatmap = {
+        'year': year,
+        'resolution': resolution,
+        'length': length,
+        'bitset': base64.b64encode(bits).decode(),
+    }
+
+    if is_past_year:
+        cache.set(cache_key, heatmap, timeout=None)
+
+    return heatmap
+
+
+def expand_heatmap(heatmap):
+    """
+    Return the ISO dates (days) or YYYY-MM months whose bit is set in the heatmap.
+    """
+    bits = base64.b64decode(heatmap['bitset'])
+    year = heatmap['year']
+    indexes = [i for i in range(heatmap['length']) if bits[i // 8] & (1 << (i % 8))]
+
+    if heatmap['resolution'] == 'month':
+        return [f'{year}-{index + 1:02d}' for index in indexes]
+    return [date.fromordinal(date(year, 1, 1).toordinal() + index).isoformat() for index in indexes]
+
+
+def invalidate_heatmap(habit_id, day):
+    if day.year < timezone.localdate().year:
+        invalidate_heatmaps([(habit_id, day.year)])
+
+
+def invalidate_heatmaps(habit_years):
+    """Drop the cached heatmaps of the given (habit id, year) pairs."""
+    cache.delete_many([
+        _heatmap_cache_key(habit_id, resolution, year)
+        for habit_id, year in habit_years for resolution in ('day', 'month')
+    ])
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+from apps.habits.models import Habit
+from apps.habits.periods import get_period_key
+
+
+class Command(BaseCommand):
+    help = "Fill Habit.last_completed_at and Habit.last_period_key from existing habit logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        backfilled = 0
+
+        while True:
+            habits = list(
+                Habit.objects.filter(pk__gt=last_pk)
+                .select_related('user')
+                .order_by('pk')
+                .annotate(latest_completed_at=Max('logs__completed_at'))[:batch_size]
+            )
+            if not habits:
+                break
+
+            for habit in habits:
+                habit.last_completed_at = habit.latest_completed_at
+                habit.last_period_key = get_period_key(
+                    habit.frequency,
+                    timezone.localdate(habit.latest_completed_at, habit.user.timezone),
+                ) if habit.latest_completed_at else None
+
+            Habit.objects.bulk_update(habits, ['last_completed_at', 'last_period_key'])
+
+            backfilled += len(habits)
+            last_pk = habits[-1].pk
+            self.stdout.write(f"Backfilled {backfilled} habits")
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.habits.export import EXPORT_WRITERS, export_habit_logs
+from apps.habits.models import HabitLog
+
+
+class Command(BaseCommand):
+    help = "Stream habit logs of all users (or one user) to a local NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the file to write")
+        parser.add_argument('--format', choices=list(EXPORT_WRITERS), default='ndjson')
+        parser.add_argument('--user', type=int, help="Only export logs of this user id")
+        parser.add_argument('--chunk-size', type=int, default=settings.HABIT_LOG_EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        # Logs of soft-deleted habits and users are waiting to be purged and stay out.
+        logs = HabitLog.objects.filter(
+            habit__deleted_at__isnull=True, user__deleted_at__isnull=True
+        )
+        if options['user'] is not None:
+            logs = logs.filter(user_id=options['user'])
+
+        lines = export_habit_logs(logs, options['format'], options['chunk_size'])
+        written = 0
+
+        with open(options['output'], 'w', newline='') as output:
+            for line in lines:
+                output.write(line)
+                written += 1
+                if written % options['chunk_size'] == 0:
+                    self.stdout.write(f"Exported {written} lines")
+
+        self.stdout.write(f"Exported {written} lines to {options['output']}")
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.habits.partitions import (
+    convert_to_partitioned, ensure_partitions, expire_partitions, is_partitioned
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly partitions of the habit log table and detach or drop "
+        "expired ones; --convert turns the table into a partitioned table first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true')
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.HABIT_LOG_PARTITION_MONTHS_AHEAD
+        )
+        parser.add_argument(
+            '--retention-months', type=int, default=settings.HABIT_LOG_RETENTION_MONTHS,
+            help="Detach partitions older than this many months (0 keeps every partition)"
+        )
+        parser.add_argument('--drop', action='store_true', help="Drop expired partitions")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            if not options['convert']:
+                raise CommandError("Habit logs are not partitioned, run with --convert first")
+            convert_to_partitioned(options['months_ahead'])
+            self.stdout.write("Converted habit logs to a partitioned table")
+
+        for name in ensure_partitions(options['months_ahead']):
+            self.stdout.write(f"Created partition {name}")
+
+        if options['retention_months']:
+            action = 'Dropped' if options['drop'] else 'Detached'
+            for name in expire_partitions(options['retention_months'], options['drop']):
+                self.stdout.write(f"{action} partition {name}")
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractYear, TruncDate
+from apps.habits.heatmap import invalidate_heatmaps
+from apps.habits.models import Habit, HabitLog, HabitPeriodStat
+
+
+class Command(BaseCommand):
+    help = "Rebuild the HabitPeriodStat daily completion rollup from habit logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        rebuilt = 0
+
+        while True:
+            habits = list(
+                Habit.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'user__timezone')[:batch_size]
+            )
+            if not habits:
+                break
+
+            habit_ids = [habit_id for habit_id, _ in habits]
+            habits_by_timezone = {}
+            for habit_id, tz in habits:
+                habits_by_timezone.setdefault(tz, []).append(habit_id)
+
+            # Completions count towards the owner's local day, as in stats.add_completions.
+            rollups = [
+                HabitLog.objects.filter(habit_id__in=tz_habit_ids)
+                .annotate(period=TruncDate('completed_at', tzinfo=tz))
+                .values('habit_id', 'period')
+                .annotate(completions=Count('id'))
+                .order_by()
+                for tz, tz_habit_ids in habits_by_timezone.items()
+            ]
+
+            # Cached past-year heatmaps of every year the rollup changes in are dropped, since
+            # the rebuild bypasses the HabitLog signals that normally invalidate them.
+            stats = HabitPeriodStat.objects.filter(habit_id__in=habit_ids)
+            years = set(
+                stats.annotate(year=ExtractYear('period')).values_list('habit_id', 'year')
+            )
+
+            def rebuilt_stats():
+                for rollup in rollups:
+                    for row in rollup.iterator():
+                        years.add((row['habit_id'], row['period'].year))
+                        yield HabitPeriodStat(**row)
+
+            with transaction.atomic():
+                stats.delete()
+                HabitPeriodStat.objects.bulk_create(rebuilt_stats(), batch_size=batch_size)
+
+            invalidate_heatmaps(years)
+
+            rebuilt += len(habit_ids)
+            last_pk = habit_ids[-1]
+            self.stdout.write(f"Rebuilt period stats for {rebuilt} habits")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from apps.habits.models import Habit
+from apps.habits.streaks import recompute_streaks
+
+
+class Command(BaseCommand):
+    help = "Rebuild current and longest streaks of all habits from their logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        recomputed = 0
+
+        while True:
+            habit_ids = list(
+                Habit.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not habit_ids:
+                break
+
+            recompute_streaks(habit_ids)
+
+            recomputed += len(habit_ids)
+            last_pk = habit_ids[-1]
+            self.stdout.write(f"Recomputed streaks for {recomputed} habits")
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0002_reminder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="last_completed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="last_period_key",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+    ]
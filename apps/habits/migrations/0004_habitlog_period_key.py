@@ -0,0 +1,67 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def get_period_key(frequency, day):
+    if frequency == "daily":
+        return day.toordinal()
+    if frequency == "monthly":
+        return day.year * 12 + day.month - 1
+    return None
+
+
+def fill_period_keys(apps, schema_editor):
+    """
+    Store the period key on existing logs. Logs ordered by habit and completion time
+    put duplicates of a period next to each other; only the first one gets the key,
+    so the unique constraint added in the next migration holds for existing data.
+    """
+    HabitLog = apps.get_model("habits", "HabitLog")
+    logs = (
+        HabitLog.objects.select_related("habit")
+        .order_by("habit_id", "completed_at", "id")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+    previous = None
+    batch = []
+    for log in logs:
+        period_key = get_period_key(
+            log.habit.frequency, django.utils.timezone.localdate(log.completed_at)
+        )
+        if period_key is not None and (log.habit_id, period_key) != previous:
+            log.period_key = period_key
+            batch.append(log)
+        previous = (log.habit_id, period_key)
+
+        if len(batch) >= BATCH_SIZE:
+            HabitLog.objects.bulk_update(batch, ["period_key"])
+            batch = []
+
+    HabitLog.objects.bulk_update(batch, ["period_key"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0003_habit_last_completed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habitlog",
+            name="period_key",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="habitlog",
+            name="completed_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RunPython(fill_period_keys, migrations.RunPython.noop),
+    ]
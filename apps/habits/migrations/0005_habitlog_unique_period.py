@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0004_habitlog_period_key"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="habitlog",
+            constraint=models.UniqueConstraint(
+                fields=("habit", "period_key"), name="habitlog_unique_period"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0005_habitlog_unique_period"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habitlog",
+            index=models.Index(
+                fields=["completed_at", "id"], name="habitlog_completed_at_id_idx"
+            ),
+        ),
+    ]
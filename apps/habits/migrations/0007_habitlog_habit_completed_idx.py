@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0006_habitlog_completed_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habitlog",
+            index=models.Index(
+                fields=["habit", "completed_at"], name="habitlog_habit_completed_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habitlog",
+            name="habit",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="logs",
+                to="habits.habit",
+            ),
+        ),
+    ]
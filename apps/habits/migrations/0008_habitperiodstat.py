@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0007_habitlog_habit_completed_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitPeriodStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period", models.DateField()),
+                ("completions", models.PositiveIntegerField(default=0)),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="period_stats",
+                        to="habits.habit",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "period"), name="habitperiodstat_unique_period"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0008_habitperiodstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="longest_streak",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:12
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractHour, ExtractMinute
+
+
+def fill_utc_minutes(apps, schema_editor):
+    """Every user starts out in UTC, so reminders are due at their reminder_time."""
+    Reminder = apps.get_model("habits", "Reminder")
+    Reminder.objects.update(
+        utc_minute_of_day=ExtractHour("reminder_time") * 60
+        + ExtractMinute("reminder_time")
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0010_habit_deleted_at"),
+        ("users", "0004_customuser_timezone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reminder",
+            name="utc_minute_of_day",
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="reminder",
+            index=models.Index(
+                fields=["utc_minute_of_day"], name="reminder_utc_minute_idx"
+            ),
+        ),
+        migrations.RunPython(fill_utc_minutes, migrations.RunPython.noop),
+    ]
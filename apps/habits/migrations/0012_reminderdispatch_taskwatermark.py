@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0011_reminder_utc_minute_of_day"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("processed_until", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ReminderDispatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "reminder",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dispatches",
+                        to="habits.reminder",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("reminder", "date"), name="reminderdispatch_unique_date"
+                    )
+                ],
+            },
+        ),
+    ]
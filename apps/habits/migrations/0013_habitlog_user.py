@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_log_users(apps, schema_editor):
+    """Copy each habit's owner onto its logs."""
+    Habit = apps.get_model("habits", "Habit")
+    HabitLog = apps.get_model("habits", "HabitLog")
+    HabitLog.objects.update(
+        user_id=Subquery(
+            Habit.objects.filter(pk=OuterRef("habit_id")).values("user_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0012_reminderdispatch_taskwatermark"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habitlog",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="habit_logs",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(fill_log_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="habitlog",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="habit_logs",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="habitlog",
+            name="habitlog_completed_at_id_idx",
+        ),
+        migrations.AddIndex(
+            model_name="habitlog",
+            index=models.Index(
+                fields=["user", "completed_at", "id"],
+                name="habitlog_user_completed_id_idx",
+            ),
+        ),
+    ]
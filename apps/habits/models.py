@@ -1,28 +1,149 @@
 from django.db import models
+from django.db.models.functions import ExtractHour, ExtractMinute, Mod
 from django.contrib.auth import get_user_model
-from .constants import FREQUENCY_CHOICES, GOAL_STATUS_CHOICES
+from django.utils import timezone
+from .constants import FREQUENCY_CHOICES, GOAL_STATUS_CHOICES, PERIOD_FREQUENCIES
+from .periods import (
+    get_period_bounds, get_period_key, get_utc_minute_of_day, get_utc_offset_minutes
+)
 
 
 User = get_user_model()
 
 
+class HabitQuerySet(models.QuerySet):
+    def with_dashboard_data(self):
+        """
+        Load everything HabitDashboardSerializer needs in a fixed number of queries:
+        the reminder is joined, in-progress goals and current-period logs are prefetched.
+        """
+        today = timezone.localdate()
+        period_keys = [get_period_key(frequency, today) for frequency in PERIOD_FREQUENCIES]
+        # Current-period logs all fall in this month; the bounds let PostgreSQL skip every
+        # other partition when the habit log table is partitioned.
+        month_start, month_end = get_period_bounds('monthly', today)
+
+        return self.select_related('reminder').prefetch_related(
+            models.Prefetch(
+                'goals',
+                queryset=Goal.objects.filter(status='in_progress'),
+                to_attr='in_progress_goals',
+            ),
+            models.Prefetch(
+                'logs',
+                queryset=HabitLog.objects.filter(
+                    period_key__in=period_keys,
+                    completed_at__gte=month_start,
+                    completed_at__lt=month_end,
+                ),
+                to_attr='current_period_logs',
+            ),
+        )
+
+
+class ActiveHabitManager(models.Manager.from_queryset(HabitQuerySet)):
+    """Default manager that hides habits waiting to be purged after a soft delete."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Habit(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits')
     name = models.CharField(max_length=100)
     frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='daily')
     created_at = models.DateTimeField(auto_now_add=True)
+    last_completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_period_key = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+    longest_streak = models.PositiveIntegerField(default=0, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ActiveHabitManager()
+    all_objects = HabitQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='habit_deleted_at_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.email})"
 
 
+class HabitLogQuerySet(models.QuerySet):
+    def filter_history(
+        self, habit=None, completed_after=None, completed_before=None, frequency=None
+    ):
+        """
+        Narrow logs down to one habit, a frequency and/or a [completed_after, completed_before)
+        time range; a single habit with a time range is one scan of the (habit, completed_at) index.
+        """
+        queryset = self
+        if habit is not None:
+            queryset = queryset.filter(habit_id=habit)
+        if completed_after is not None:
+            queryset = queryset.filter(completed_at__gte=completed_after)
+        if completed_before is not None:
+            queryset = queryset.filter(completed_at__lt=completed_before)
+        if frequency is not None:
+            queryset = queryset.filter(habit__frequency=frequency)
+        return queryset
+
+
 class HabitLog(models.Model):
-    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='logs')
-    completed_at = models.DateTimeField(auto_now_add=True)
+    # Lookups by habit are served by the (habit, completed_at) index below.
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, related_name='logs', db_index=False
+    )
+    # The habit's owner, copied onto the log so a user's history is one scan of the
+    # (user, completed_at, id) index below; lookups by user are served by that index.
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='habit_logs', db_index=False,
+        editable=False,
+    )
+    completed_at = models.DateTimeField(default=timezone.now, editable=False)
+    period_key = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['habit', 'period_key'], name='habitlog_unique_period'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'completed_at', 'id'], name='habitlog_user_completed_id_idx'
+            ),
+            models.Index(fields=['habit', 'completed_at'], name='habitlog_habit_completed_idx'),
+        ]
+
+    objects = HabitLogQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.habit.name} completed at {self.completed_at}"
 
+    def save(self, *args, **kwargs):
+        # The period key, and the rollups and caches the signals maintain, follow the
+        # local date of the habit's owner.
+        with timezone.override(self.habit.user.timezone):
+            if self._state.adding:
+                self.user_id = self.habit.user_id
+                if self.period_key is None:
+                    self.period_key = get_period_key(
+                        self.habit.frequency, timezone.localdate(self.completed_at)
+                    )
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timezone.override(self.habit.user.timezone):
+            return super().delete(*args, **kwargs)
+
 
 class Goal(models.Model):
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='goals')
@@ -34,9 +155,93 @@ class Goal(models.Model):
         return f"{self.habit.name} - Goal: {self.current_streak} out of {self.target_streak}"
 
 
+class ReminderQuerySet(models.QuerySet):
+    def sync_utc_minute_of_day(self, tz):
+        """
+        Recompute utc_minute_of_day of the reminders of users in `tz` from its current UTC
+        offset with a single UPDATE, touching only rows that changed (e.g. after a DST
+        transition). Returns the number of updated reminders.
+        """
+        utc_minute_of_day = Mod(
+            ExtractHour('reminder_time') * 60 + ExtractMinute('reminder_time')
+            - get_utc_offset_minutes(tz) + 1440,
+            1440,
+        )
+        return self.filter(habit__user__timezone=tz).exclude(
+            utc_minute_of_day=utc_minute_of_day
+        ).update(utc_minute_of_day=utc_minute_of_day)
+
+
 class Reminder(models.Model):
     habit = models.OneToOneField(Habit, on_delete=models.CASCADE, related_name='reminder')
     reminder_time = models.TimeField()
+    # Minute of the UTC day the reminder is due at, from reminder_time in the user's timezone
+    utc_minute_of_day = models.PositiveSmallIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['utc_minute_of_day'], name='reminder_utc_minute_idx'),
+        ]
+
+    objects = ReminderQuerySet.as_manager()
 
     def __str__(self):
         return f"Reminder on {self.habit.name} at {self.reminder_time}"
+
+    def save(self, *args, **kwargs):
+        self.reminder_time = self._meta.get_field('reminder_time').to_python(self.reminder_time)
+        self.utc_minute_of_day = get_utc_minute_of_day(
+            self.reminder_time, self.habit.user.timezone
+        )
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'utc_minute_of_day'}
+        super().save(*args, **kwargs)
+
+
+class ReminderDispatch(models.Model):
+    """
+    A reminder queued for sending on a local date of its owner; each reminder is sent
+    once a day.
+    """
+    reminder = models.ForeignKey(Reminder, on_delete=models.CASCADE, related_name='dispatches')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reminder', 'date'], name='reminderdispatch_unique_date'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.reminder} dispatched on {self.date}"
+
+
+class TaskWatermark(models.Model):
+    """The point in time up to which a periodic task has processed its work."""
+    name = models.CharField(max_length=100, primary_key=True)
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} processed until {self.processed_until}"
+
+
+class HabitPeriodStat(models.Model):
+    """
+    Daily completion rollup of a habit; monthly and longer figures are sums of these rows.
+    """
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, related_name='period_stats', db_index=False
+    )
+    period = models.DateField()
+    completions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['habit', 'period'], name='habitperiodstat_unique_period'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.habit.name} completed {self.completions} times on {self.period}"
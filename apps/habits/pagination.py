@@ -0,0 +1,115 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class HabitCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the habit endpoints.
+
+    Views choose their ordering with a `pagination_ordering` attribute; the first field
+    is used as the cursor position, so deep pages cost the same as the first one.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'pagination_ordering', self.ordering)
+
+
+class AsyncKeysetPagination:
+    """
+    Keyset pagination for the async views, which cannot go through DRF's synchronous
+    paginators. Pages are ordered by `ordering` and the cursor holds the values of
+    every ordering field of the last (or first) row, so ties on the leading field are
+    resolved by the following ones. Responses use the same `next`/`previous`/`results`
+    shape as HabitCursorPagination.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = HabitCursorPagination.page_size_query_param
+    max_page_size = HabitCursorPagination.max_page_size
+    invalid_cursor_message = HabitCursorPagination.invalid_cursor_message
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(page_size, self.max_page_size) if page_size > 0 else api_settings.PAGE_SIZE
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.GET.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            fields = [
+                queryset.model._meta.get_field(field.lstrip('-')) for field in self.ordering
+            ]
+            position = [
+                field.to_python(value) for field, value in zip(fields, cursor['p'], strict=True)
+            ]
+            return position, bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, request, row, reverse):
+        position = [getattr(row, field.lstrip('-')) for field in self.ordering]
+        cursor = {
+            'p': [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in position],
+            'r': int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(
+            request.build_absolute_uri(), self.cursor_query_param, encoded
+        )
+
+    def _keyset_filter(self, position, reverse):
+        """Match rows strictly after `position` in the (optionally reversed) ordering."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            clause = Q(**{f'{name}__{"lt" if descending else "gt"}': position[index]})
+            for previous_field, value in zip(self.ordering[:index], position[:index]):
+                clause &= Q(**{previous_field.lstrip('-'): value})
+            condition |= clause
+        return condition
+
+    async def apaginate(self, request, queryset):
+        """Return the rows of the requested page with the `next` and `previous` links."""
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(position, reverse))
+
+        rows = [row async for row in queryset.order_by(*ordering)[:page_size + 1]]
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_url = self.encode_cursor(request, rows[-1], False) if rows and has_next else None
+        previous_url = (
+            self.encode_cursor(request, rows[0], True) if rows and has_previous else None
+        )
+        return rows, next_url, previous_url
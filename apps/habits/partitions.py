@@ -0,0 +1,199 @@
+import re
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Habit, HabitLog
+
+TABLE = HabitLog._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+# PostgreSQL cannot enforce a unique constraint without the partition key on the
+# partitioned table itself, so habitlog_unique_period becomes one unique index per monthly
+# partition. Partitions are months in TIME_ZONE: a period never spans two of them for users
+# in that timezone, while the local days and months of users elsewhere can straddle a month
+# boundary and are then only checked within each partition. Writers therefore check the
+# period themselves under lock_habits_for_logging() while partitioning is enabled.
+UNIQUE_PERIOD_INDEX = 'habitlog_unique_period'
+
+
+def lock_habits_for_logging(habit_ids):
+    """
+    Lock the habits about to be logged when HABIT_LOG_PARTITIONING is on, and return
+    whether the caller has to check for an existing log of the period itself. The lock
+    keeps concurrent logs of a habit from passing that check together; it must be taken
+    inside the transaction that inserts the logs.
+    """
+    if not settings.HABIT_LOG_PARTITIONING:
+        return False
+    list(Habit.all_objects.select_for_update().filter(pk__in=habit_ids).values_list('pk'))
+    return True
+
+
+def _add_months(year, month, months):
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return year, month + 1
+
+
+def _month_start(year, month):
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def _partition_name(year, month):
+    return f'{TABLE}_p{year:04d}{month:02d}'
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Return (year, month) of every monthly partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass',
+            [TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+    return sorted(
+        (int(match[1]), int(match[2])) for match in map(PARTITION_NAME.match, names) if match
+    )
+
+
+def _create_partition(cursor, name, index_suffix, bounds=None):
+    """
+    Create a partition of the habit log table and attach it. Monthly partitions take over
+    the rows of their month from the default partition, so months can be added at any time.
+    """
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+    if bounds is None:
+        partition_of = 'DEFAULT'
+    else:
+        cursor.execute(
+            f'WITH moved AS ('
+            f'DELETE FROM {DEFAULT_PARTITION} WHERE completed_at >= %s AND completed_at < %s '
+            f'RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+            bounds,
+        )
+        partition_of = 'FOR VALUES FROM (%s) TO (%s)'
+    cursor.execute(
+        f'CREATE UNIQUE INDEX {UNIQUE_PERIOD_INDEX}_{index_suffix} '
+        f'ON {name} (habit_id, period_key)'
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} {partition_of}', bounds)
+
+
+def create_month_partition(cursor, year, month):
+    next_year, next_month = _add_months(year, month, 1)
+    _create_partition(
+        cursor,
+        _partition_name(year, month),
+        f'p{year:04d}{month:02d}',
+        [_month_start(year, month), _month_start(next_year, next_month)],
+    )
+
+
+@transaction.atomic
+def ensure_partitions(months_ahead):
+    """Create the partitions of the current month and the next `months_ahead` months."""
+    today = timezone.localdate()
+    existing = set(list_partitions())
+    created = []
+
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            year, month = _add_months(today.year, today.month, offset)
+            if (year, month) not in existing:
+                create_month_partition(cursor, year, month)
+                created.append(_partition_name(year, month))
+
+    return created
+
+
+@transaction.atomic
+def expire_partitions(retention_months, drop=False):
+    """
+    Detach the partitions of months that ended more than `retention_months` months ago,
+    dropping them when `drop` is set. Detached tables are kept for archiving.
+    """
+    today = timezone.localdate()
+    cutoff = _add_months(today.year, today.month, -retention_months)
+    expired = [
+        _partition_name(year, month)
+        for year, month in list_partitions() if (year, month) < cutoff
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for name in expired:
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+            if drop:
+                cursor.execute(f'DROP TABLE {name}')
+
+    return expired
+
+
+@transaction.atomic
+def convert_to_partitioned(months_ahead):
+    """
+    Rebuild the habit log table as a table partitioned by local month on completed_at,
+    with one partition per month from the oldest log up to `months_ahead` months ahead
+    and a default partition for anything outside that range. Rows, ids, indexes and
+    the foreign key to habits are carried over; the table is locked while it is copied.
+    """
+    legacy = f'{TABLE}_unpartitioned'
+    sequence = f'{TABLE}_id_seq'
+
+    with connection.cursor() as cursor:
+        # Deferred foreign key checks of rows written earlier in the transaction would
+        # otherwise block dropping and detaching tables.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(completed_at) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (completed_at)'
+        )
+        cursor.execute(f'CREATE SEQUENCE {sequence}_new OWNED BY {TABLE}.id')
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{sequence}_new')"
+        )
+
+        _create_partition(cursor, DEFAULT_PARTITION, 'default')
+        today = timezone.localdate()
+        first = timezone.localdate(oldest) if oldest else today
+        year, month = first.year, first.month
+        last = _add_months(today.year, today.month, months_ahead)
+        while (year, month) <= last:
+            create_month_partition(cursor, year, month)
+            year, month = _add_months(year, month, 1)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+        cursor.execute(
+            f"SELECT setval('{sequence}_new', COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}"
+        )
+        cursor.execute(f'DROP TABLE {legacy}')
+        cursor.execute(f'ALTER SEQUENCE {sequence}_new RENAME TO {sequence}')
+
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, completed_at)')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+    with connection.schema_editor(atomic=False) as schema_editor:
+        for index in HabitLog._meta.indexes:
+            schema_editor.add_index(HabitLog, index)
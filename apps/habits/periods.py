@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+
+def get_period_start(frequency, day):
+    """
+    Return the first day of the period that contains `day`, or None
+    for frequencies that are not tracked per period.
+    """
+    if frequency == 'daily':
+        return day
+    if frequency == 'monthly':
+        return day.replace(day=1)
+    return None
+
+
+def get_period_key(frequency, day):
+    """
+    Return an integer that identifies the period containing `day`:
+    the day ordinal for daily habits and the month ordinal for monthly habits.
+    """
+    if frequency == 'daily':
+        return day.toordinal()
+    if frequency == 'monthly':
+        return day.year * 12 + day.month - 1
+    return None
+
+
+def get_previous_period_start(frequency, day):
+    period_start = get_period_start(frequency, day)
+    if period_start is None:
+        return None
+    return get_period_start(frequency, period_start - timedelta(days=1))
+
+
+def get_period_bounds(frequency, day):
+    """
+    Return the aware [start, end) datetime range of the period that contains `day`.
+    """
+    period_start = get_period_start(frequency, day)
+    if period_start is None:
+        return None
+
+    if frequency == 'daily':
+        period_end = period_start + timedelta(days=1)
+    else:
+        period_end = (period_start + timedelta(days=31)).replace(day=1)
+
+    return _start_of_day(period_start), _start_of_day(period_end)
+
+
+def count_periods(frequency, first_day, last_day):
+    """
+    Return how many periods of the frequency touch the [first_day, last_day] date range;
+    habits without a period are expected once a week.
+    """
+    if frequency == 'daily':
+        return (last_day - first_day).days + 1
+    if frequency == 'monthly':
+        return (last_day.year - first_day.year) * 12 + last_day.month - first_day.month + 1
+    return -(-((last_day - first_day).days + 1) // 7)
+
+
+def get_utc_offset_minutes(tz, moment=None):
+    """Return the UTC offset of `tz` in minutes at `moment` (now by default)."""
+    return int((moment or timezone.now()).astimezone(tz).utcoffset().total_seconds() // 60)
+
+
+def get_utc_minute_of_day(local_time, tz):
+    """Return the minute of the UTC day at which `local_time` in `tz` currently falls."""
+    return (local_time.hour * 60 + local_time.minute - get_utc_offset_minutes(tz)) % 1440
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -1,13 +1,17 @@
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
+from .constants import FREQUENCY_CHOICES, ONE_LOG_PER_PERIOD_MESSAGES, PERIOD_FREQUENCIES
 from .models import Habit, Goal, HabitLog, Reminder
+from .partitions import lock_habits_for_logging
+from .periods import get_period_key
 
 
 class HabitSerializer(serializers.ModelSerializer):
     class Meta:
         model = Habit
-        fields = ['id', 'name', 'frequency', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'name', 'frequency', 'created_at', 'longest_streak']
+        read_only_fields = ['id', 'created_at', 'longest_streak']
 
 
 class GoalSerializer(serializers.ModelSerializer):
@@ -50,36 +54,94 @@ class HabitLogSerializer(serializers.ModelSerializer):
     def validate(self, data):
         habit = data.get('habit')
 
-        if habit and self.context.get('request') and self.context['request'].user != habit.user:
+        request = self.context.get('request')
+
+        if habit and request:
+            if request.user.id != habit.user_id:
+                raise serializers.ValidationError({
+                    'habit': 'You can only logs your own habits.'
+                })
+            # Saving the log needs the owner's timezone; the owner is the requesting user.
+            habit.user = request.user
+
+        return data
+
+    def create(self, validated_data):
+        """
+        Insert the log and let the habitlog_unique_period constraint reject
+        a second log for the same period. A partitioned log table only enforces the
+        constraint within a partition, so the period is then checked explicitly too.
+        """
+        habit = validated_data['habit']
+        try:
+            with transaction.atomic():
+                if lock_habits_for_logging([habit.pk]):
+                    validated_data['completed_at'] = timezone.now()
+                    period_key = get_period_key(
+                        habit.frequency,
+                        timezone.localdate(validated_data['completed_at'], habit.user.timezone),
+                    )
+                    if period_key is not None and HabitLog.objects.filter(
+                        habit=habit, period_key=period_key
+                    ).exists():
+                        raise self._period_logged_error(habit)
+                return super().create(validated_data)
+        except IntegrityError as e:
+            if 'habitlog_unique_period' not in str(e):
+                raise
+            raise self._period_logged_error(habit)
+
+    def _period_logged_error(self, habit):
+        return serializers.ValidationError({
+            'habit': [ONE_LOG_PER_PERIOD_MESSAGES[habit.frequency]]
+        })
+
+
+class HabitLogSyncItemSerializer(serializers.Serializer):
+    habit = serializers.IntegerField()
+    completed_at = serializers.DateTimeField()
+
+    def validate_completed_at(self, value):
+        if value > timezone.now():
+            raise serializers.ValidationError('Habit logs cannot be completed in the future.')
+        return value
+
+
+class HabitLogFilterSerializer(serializers.Serializer):
+    habit = serializers.IntegerField(required=False)
+    completed_after = serializers.DateTimeField(required=False)
+    completed_before = serializers.DateTimeField(required=False)
+    # Monthly habits are logged per period too, though FREQUENCY_CHOICES does not list them.
+    frequency = serializers.ChoiceField(
+        choices=list(dict.fromkeys([*dict(FREQUENCY_CHOICES), *PERIOD_FREQUENCIES])),
+        required=False,
+    )
+
+    def validate(self, data):
+        completed_after = data.get('completed_after')
+        completed_before = data.get('completed_before')
+
+        if completed_after and completed_before and completed_after >= completed_before:
             raise serializers.ValidationError({
-                'habit': 'You can only logs your own habits.'
+                'completed_before': 'completed_before must be later than completed_after.'
             })
 
-        if habit:
-            now = timezone.now()
-
-            frequency_validators = {
-                'daily': {
-                    'filter': {'habit': habit, 'completed_at__date': now.date()},
-                    'message': 'You can only log daily habit once per day.'
-                },
-                'monthly': {
-                    'filter': {
-                        'habit': habit,
-                        'completed_at__year': now.year,
-                        'completed_at__month': now.month
-                    },
-                    'message': 'You can only log monthly habit once per month.'
-                }
-            }
-
-            validator = frequency_validators.get(habit.frequency)
-            if validator and HabitLog.objects.filter(**validator['filter']).exists():
-                raise serializers.ValidationError({'habit': validator['message']})
-
         return data
 
 
+class HabitLogExportQuerySerializer(HabitLogFilterSerializer):
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], required=False, default='ndjson')
+
+
+class HabitStatsQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(required=False, default=30, min_value=1, max_value=3660)
+
+
+class HabitCalendarQuerySerializer(serializers.Serializer):
+    year = serializers.IntegerField(required=False, min_value=1970, max_value=9999)
+    expand = serializers.BooleanField(required=False, default=False)
+
+
 class ReminderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reminder
@@ -87,8 +149,14 @@ class ReminderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def validate_habit(self, value):
-        if self.context.get('request') and self.context['request'].user != value.user:
-            raise serializers.ValidationError('You can only create reminders for your own habits.')
+        request = self.context.get('request')
+        if request:
+            if request.user.id != value.user_id:
+                raise serializers.ValidationError(
+                    'You can only create reminders for your own habits.'
+                )
+            # Saving the reminder needs the owner's timezone; the owner is the requesting user.
+            value.user = request.user
         return value
 
 
@@ -120,22 +188,24 @@ class HabitDashboardSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'frequency', 'current_goal', 'today_log', 'reminder']
 
     def get_current_goal(self, habit):
-        goal = Goal.objects.filter(habit=habit, status='in_progress').first()
+        if hasattr(habit, 'in_progress_goals'):
+            goal = habit.in_progress_goals[0] if habit.in_progress_goals else None
+        else:
+            goal = Goal.objects.filter(habit=habit, status='in_progress').first()
         return GoalCompactSerializer(goal).data if goal else None
 
     def get_today_log(self, habit):
-        now = timezone.now()
-
-        frequency_log_filters = {
-            'daily': {'completed_at__date': now.date()},
-            'monthly': {
-                'completed_at__year': now.year,
-                'completed_at__month': now.month
-            }
-        }
-
-        log_filter = frequency_log_filters.get(habit.frequency, {})
-        log = habit.logs.filter(**log_filter).first() if log_filter else None
+        period_key = get_period_key(habit.frequency, timezone.localdate())
+
+        if period_key is None or habit.last_period_key != period_key:
+            return None
+
+        if hasattr(habit, 'current_period_logs'):
+            log = next(
+                (log for log in habit.current_period_logs if log.period_key == period_key), None
+            )
+        else:
+            log = habit.logs.filter(period_key=period_key).first()
 
         return HabitLogCompactSerializer(log).data if log else None
 
@@ -1,18 +1,107 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import HabitLog, Goal
+from django.utils import timezone
+from .cache import bump_dashboard_version
+from .heatmap import invalidate_heatmap
+from .models import Habit, HabitLog, Goal, Reminder
+from .stats import add_completions, remove_completion
 
 
 @receiver(post_save, sender=HabitLog)
 def update_goal_current_streak(sender, instance, created, **kwargs):
+    if created:
+        # A single UPDATE keeps concurrent logs from losing increments;
+        # SET expressions see the old current_streak, hence the "- 1".
+        Goal.objects.filter(habit_id=instance.habit_id, status='in_progress').update(
+            current_streak=F('current_streak') + 1,
+            status=Case(
+                When(current_streak__gte=F('target_streak') - 1, then=Value('completed')),
+                default=F('status'),
+            ),
+        )
+
+
+@receiver(post_save, sender=HabitLog)
+def update_habit_last_completed(sender, instance, created, **kwargs):
     if created:
         habit = instance.habit
-        goal = Goal.objects.filter(habit=habit, status='in_progress').first()
+        habit.last_completed_at = instance.completed_at
+        habit.last_period_key = instance.period_key
+
+        Habit.objects.filter(pk=habit.pk).filter(
+            Q(last_completed_at__isnull=True) | Q(last_completed_at__lte=instance.completed_at)
+        ).update(
+            last_completed_at=habit.last_completed_at,
+            last_period_key=habit.last_period_key,
+        )
+
+
+@receiver(post_delete, sender=HabitLog)
+def rewind_habit_last_completed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Habit):
+        return
+
+    habit = Habit.objects.filter(
+        pk=instance.habit_id, last_completed_at=instance.completed_at
+    ).first()
+
+    if habit:
+        latest_log = habit.logs.order_by('-completed_at').first()
+        habit.last_completed_at = latest_log.completed_at if latest_log else None
+        habit.last_period_key = latest_log.period_key if latest_log else None
+        habit.save(update_fields=['last_completed_at', 'last_period_key'])
+
+
+@receiver(post_save, sender=HabitLog)
+def add_log_to_period_stats(sender, instance, created, **kwargs):
+    if created:
+        add_completions([instance])
+        invalidate_heatmap(instance.habit_id, timezone.localdate(instance.completed_at))
+
+
+@receiver(post_delete, sender=HabitLog)
+def remove_log_from_period_stats(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Habit):
+        remove_completion(instance)
+        invalidate_heatmap(instance.habit_id, timezone.localdate(instance.completed_at))
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+@receiver(post_save, sender=HabitLog)
+@receiver(post_delete, sender=HabitLog)
+@receiver(post_save, sender=Reminder)
+@receiver(post_delete, sender=Reminder)
+def invalidate_dashboard_cache(sender, instance, origin=None, **kwargs):
+    if sender is Habit:
+        bump_dashboard_version(instance.user_id)
+        return
+
+    # Deleting a habit bumps the version once instead of once per cascaded row.
+    if isinstance(origin, Habit):
+        return
+
+    if sender.habit.is_cached(instance):
+        user_id = instance.habit.user_id
+    else:
+        user_id = Habit.all_objects.filter(
+            pk=instance.habit_id
+        ).values_list('user_id', flat=True).first()
 
-        if goal:
-            goal.current_streak += 1
+    if user_id:
+        bump_dashboard_version(user_id)
 
-            if goal.current_streak >= goal.target_streak:
-                goal.status = 'completed'
 
-            goal.save()
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_reminder_utc_minutes(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Move the user's reminders to the UTC minutes of their (possibly new) timezone; the
+    dashboard is rebuilt since its dates depend on the timezone too.
+    """
+    if not created and (update_fields is None or 'timezone' in update_fields):
+        Reminder.objects.filter(habit__user=instance).sync_utc_minute_of_day(instance.timezone)
+        bump_dashboard_version(instance.pk)
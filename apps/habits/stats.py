@@ -0,0 +1,38 @@
+from collections import Counter
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import HabitPeriodStat
+
+
+def add_completions(logs):
+    """
+    Add the given logs to the daily rollup with a single INSERT ... ON CONFLICT statement,
+    so concurrent writers never lose an increment.
+    """
+    counts = Counter((log.habit_id, timezone.localdate(log.completed_at)) for log in logs)
+    if not counts:
+        return
+
+    table = HabitPeriodStat._meta.db_table
+    values = ', '.join(['(%s, %s, %s)'] * len(counts))
+    params = [
+        value
+        for (habit_id, period), completions in counts.items()
+        for value in (habit_id, period, completions)
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (habit_id, period, completions) VALUES {values} "
+            f"ON CONFLICT (habit_id, period) "
+            f"DO UPDATE SET completions = {table}.completions + EXCLUDED.completions",
+            params,
+        )
+
+
+def remove_completion(log):
+    HabitPeriodStat.objects.filter(
+        habit_id=log.habit_id, period=timezone.localdate(log.completed_at)
+    ).update(completions=Greatest(F('completions') - 1, 0))
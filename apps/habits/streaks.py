@@ -0,0 +1,102 @@
+from django.db import connection
+from django.utils import timezone
+from .cache import bump_dashboard_version
+from .models import Goal, Habit, HabitLog
+from .periods import get_period_key
+
+# Gaps and islands: within one habit, consecutive period keys minus their row number
+# are constant, so each (habit, island) group is one unbroken streak. A streak is current
+# when it reaches the current or the previous period of the habit's frequency.
+STREAKS_SQL = f"""
+WITH habits AS (
+    SELECT id, user_id,
+           CASE frequency
+               WHEN 'daily' THEN %(day_key)s
+               WHEN 'monthly' THEN %(month_key)s
+           END AS current_key
+    FROM {Habit._meta.db_table}
+    WHERE id = ANY(%(habit_ids)s)
+), keyed AS (
+    SELECT log.habit_id, log.period_key,
+           log.period_key - ROW_NUMBER() OVER (
+               PARTITION BY log.habit_id ORDER BY log.period_key
+           ) AS island
+    FROM {HabitLog._meta.db_table} log
+    JOIN habits ON habits.id = log.habit_id
+    WHERE log.period_key <= habits.current_key
+), islands AS (
+    SELECT habit_id, MAX(period_key) AS last_key, COUNT(*) AS length
+    FROM keyed
+    GROUP BY habit_id, island
+)
+SELECT habits.id, habits.user_id,
+       COALESCE(MAX(islands.length) FILTER (
+           WHERE islands.last_key >= habits.current_key - 1
+       ), 0) AS current_streak,
+       COALESCE(MAX(islands.length), 0) AS longest_streak
+FROM habits
+LEFT JOIN islands ON islands.habit_id = habits.id
+GROUP BY habits.id, habits.user_id
+"""
+
+
+def compute_streaks(habit_ids):
+    """
+    Return {habit_id: (user_id, current_streak, longest_streak)} computed by the database
+    from the period keys of the habits' logs, without loading the logs into Python.
+    The current period of each habit is the one of its owner's local date.
+    """
+    habits_by_timezone = {}
+    for habit_id, tz in Habit.all_objects.filter(pk__in=habit_ids).values_list(
+        'pk', 'user__timezone'
+    ):
+        habits_by_timezone.setdefault(tz, []).append(habit_id)
+
+    streaks = {}
+    with connection.cursor() as cursor:
+        for tz, tz_habit_ids in habits_by_timezone.items():
+            today = timezone.localdate(timezone.now(), tz)
+            cursor.execute(STREAKS_SQL, {
+                'habit_ids': tz_habit_ids,
+                'day_key': get_period_key('daily', today),
+                'month_key': get_period_key('monthly', today),
+            })
+            streaks.update(
+                (habit_id, (user_id, current_streak, longest_streak))
+                for habit_id, user_id, current_streak, longest_streak in cursor.fetchall()
+            )
+
+    return streaks
+
+
+def recompute_streaks(habit_ids, update_goals=True):
+    """
+    Store the computed longest streak on the habits and the current streak on their
+    in-progress goals, completing goals that reached their target. Goals carry no start
+    date, so a goal's streak is rebuilt as the current streak of its habit; callers that
+    advance goals themselves pass update_goals=False.
+    """
+    streaks = compute_streaks(habit_ids)
+    if not streaks:
+        return streaks
+
+    Habit.objects.bulk_update(
+        [
+            Habit(pk=habit_id, longest_streak=longest_streak)
+            for habit_id, (_, _, longest_streak) in streaks.items()
+        ],
+        ['longest_streak'],
+    )
+
+    if update_goals:
+        goals = list(Goal.objects.filter(habit_id__in=streaks, status='in_progress'))
+        for goal in goals:
+            goal.current_streak = streaks[goal.habit_id][1]
+            if goal.current_streak >= goal.target_streak:
+                goal.status = 'completed'
+        Goal.objects.bulk_update(goals, ['current_streak', 'status'])
+
+    for user_id in {user_id for user_id, _, _ in streaks.values()}:
+        bump_dashboard_version(user_id)
+
+    return streaks
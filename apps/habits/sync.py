@@ -0,0 +1,127 @@
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from .cache import bump_dashboard_version
+from .constants import ONE_LOG_PER_PERIOD_MESSAGES
+from .heatmap import invalidate_heatmap
+from .models import Goal, Habit, HabitLog
+from .partitions import lock_habits_for_logging
+from .periods import get_period_key
+from .stats import add_completions
+from .streaks import recompute_streaks
+
+
+def sync_habit_logs(user, entries, attempts=3):
+    """
+    Create the logs of already validated `entries` ({'habit': id, 'completed_at': datetime})
+    for `user` with a fixed number of queries, and return one result per entry.
+
+    Ownership and one-log-per-period are checked with set-based queries; logs are inserted
+    with a single bulk_create, and the per-log side effects (last completed period, rollup,
+    streaks, caches) run once per habit instead of once per row.
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                results, created_logs = _create_logs(user, entries)
+            break
+        except IntegrityError:
+            # A concurrent request logged one of the periods after our check; check again.
+            if attempt == attempts - 1:
+                raise
+
+    if created_logs:
+        _apply_side_effects(user, created_logs)
+
+    return results
+
+
+def _create_logs(user, entries):
+    habits = Habit.objects.filter(user=user).in_bulk({entry['habit'] for entry in entries})
+
+    period_keys = []
+    for entry in entries:
+        habit = habits.get(entry['habit'])
+        period_keys.append(
+            get_period_key(habit.frequency, timezone.localdate(entry['completed_at']))
+            if habit else None
+        )
+
+    # With a partitioned log table this check is the only one across partitions.
+    lock_habits_for_logging(habits)
+    taken_periods = set(
+        HabitLog.objects.filter(
+            habit_id__in=habits, period_key__in={key for key in period_keys if key is not None}
+        ).values_list('habit_id', 'period_key')
+    )
+
+    results = []
+    new_logs = []
+    for index, (entry, period_key) in enumerate(zip(entries, period_keys)):
+        habit = habits.get(entry['habit'])
+
+        if habit is None:
+            results.append({
+                'index': index,
+                'status': 'invalid',
+                'errors': {'habit': ['You can only logs your own habits.']},
+            })
+        elif period_key is not None and (habit.id, period_key) in taken_periods:
+            results.append({
+                'index': index,
+                'status': 'duplicate',
+                'errors': {'habit': [ONE_LOG_PER_PERIOD_MESSAGES[habit.frequency]]},
+            })
+        else:
+            if period_key is not None:
+                taken_periods.add((habit.id, period_key))
+            log = HabitLog(
+                habit=habit, user=user, completed_at=entry['completed_at'], period_key=period_key
+            )
+            new_logs.append(log)
+            results.append({'index': index, 'status': 'created', 'log': log})
+
+    HabitLog.objects.bulk_create(new_logs)
+
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = result.pop('log').id
+
+    return results, new_logs
+
+
+def _apply_side_effects(user, created_logs):
+    latest_logs = {}
+    for log in created_logs:
+        latest = latest_logs.get(log.habit_id)
+        if latest is None or log.completed_at > latest.completed_at:
+            latest_logs[log.habit_id] = log
+
+    for habit_id, log in latest_logs.items():
+        Habit.objects.filter(pk=habit_id).filter(
+            Q(last_completed_at__isnull=True) | Q(last_completed_at__lte=log.completed_at)
+        ).update(last_completed_at=log.completed_at, last_period_key=log.period_key)
+
+    # Advance goals by the newly logged periods, as the single-log signal does per log,
+    # instead of replacing them with the habit's whole streak.
+    for habit_id, count in Counter(log.habit_id for log in created_logs).items():
+        Goal.objects.filter(habit_id=habit_id, status='in_progress').update(
+            current_streak=F('current_streak') + count,
+            status=Case(
+                When(current_streak__gte=F('target_streak') - count, then=Value('completed')),
+                default=F('status'),
+            ),
+        )
+
+    add_completions(created_logs)
+
+    heatmap_years = {
+        (log.habit_id, timezone.localdate(log.completed_at).replace(month=1, day=1))
+        for log in created_logs
+    }
+    for habit_id, year_start in heatmap_years:
+        invalidate_heatmap(habit_id, year_start)
+
+    recompute_streaks(latest_logs, update_goals=False)
+    bump_dashboard_version(user.id)
@@ -1,77 +1,394 @@
-from datetime import timedelta
+import operator
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+from zoneinfo import ZoneInfo
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import (
+    BigIntegerField, BooleanField, Case, DateField, Exists, ExpressionWrapper, Max, Min,
+    OuterRef, Q, Value, When
+)
 from django.utils import timezone
-from celery import shared_task
+from django.utils.html import escape
+from celery import chord, shared_task
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import Mail, Personalization, Substitution, To
 from django.conf import settings
-from .models import Goal, HabitLog, Reminder
+from .cache import bump_dashboard_version
+from .constants import PERIOD_FREQUENCIES
+from .deletion import purge_habit_rows
+from .models import Goal, Habit, HabitLog, Reminder, ReminderDispatch, TaskWatermark
+from .partitions import ensure_partitions, expire_partitions, is_partitioned
+from .periods import get_period_bounds, get_period_key, get_previous_period_start
 
 
+User = get_user_model()
+
 sg_client = SendGridAPIClient(settings.SENDGRID_API_KEY)
 
+REMINDER_SUBJECT = "Reminder: Time for your habit - {habit_name}"
+DIGEST_SUBJECT = "Reminder: Time for your habits - {habit_names}"
+REMINDER_HTML = """
+            <h2>Habit Reminder</h2>
+            <p>Hi,</p>
+            {reminder}
+            <p>Keep up the good work!</p>
+        """
+# Replaced by SendGrid with each recipient's list of habits in a batched reminder
+REMINDER_TAG = '-reminder-'
+REMINDER_WATERMARK = 'send_daily_reminders'
+STREAK_RESET_WATERMARK = 'reset_streaks_for_inactive_habits:{tz}'
+
+
+def render_reminder(habit_names):
+    """
+    Return the subject and the HTML naming the habits of a reminder email: one habit,
+    or every habit due at once for users in digest mode.
+    """
+    if len(habit_names) == 1:
+        return (
+            REMINDER_SUBJECT.format(habit_name=habit_names[0]),
+            '<p>This is a reminder to complete your habit: '
+            f'<strong>{escape(habit_names[0])}</strong></p>'
+        )
+
+    items = ''.join(f'<li><strong>{escape(name)}</strong></li>' for name in habit_names)
+    return (
+        DIGEST_SUBJECT.format(habit_names=', '.join(habit_names)),
+        f'<p>This is a reminder to complete your habits:</p><ul>{items}</ul>'
+    )
+
 
 @shared_task
 def reset_streaks_for_inactive_habits():
-    now = timezone.now()
-
-    goals_to_reset = Goal.objects.filter(status='in_progress').select_related('habit')
+    """
+    Reset the streaks of users whose local day started since the previous reset of their
+    timezone. Each timezone keeps a watermark, so a run that is missed or fails is caught
+    up by the next one instead of skipping that timezone's reset for the day.
 
-    for goal in goals_to_reset:
-        habit = goal.habit
+    Goals are fanned out into STREAK_RESET_SHARDS shard tasks per timezone, each covering a
+    contiguous range of in-progress goal ids, and the results are summarized in a chord
+    callback. The shards are queued before the watermarks commit, so a broker failure
+    leaves the resets to the next run.
+    """
+    now = timezone.now()
+    goals = Goal.objects.filter(status='in_progress')
+    shards = []
 
-        if habit.frequency == 'daily':
-            previous_day = (now - timedelta(days=1)).date()
-            habit_logs = HabitLog.objects.filter(
-                habit=habit,
-                completed_at__date=previous_day
+    with transaction.atomic():
+        for tz in goals.values_list('habit__user__timezone', flat=True).distinct():
+            today = timezone.localdate(now, tz)
+            watermark, _ = TaskWatermark.objects.select_for_update().get_or_create(
+                name=STREAK_RESET_WATERMARK.format(tz=tz),
+                defaults={'processed_until': now - timedelta(hours=1)},
             )
-            if not habit_logs.exists():
-                goal.current_streak = 0
-                goal.save()
-
-        elif habit.frequency == 'monthly':
-            previous_month = now.month - 1 if now.month > 1 else 12
-            year = now.year if now.month > 1 else now.year - 1
-            habit_logs = HabitLog.objects.filter(
-                habit=habit,
-                completed_at__year=year,
-                completed_at__month=previous_month,
+            if timezone.localdate(watermark.processed_until, tz) >= today:
+                continue
+
+            pk_range = goals.filter(habit__user__timezone=tz).aggregate(
+                first=Min('pk'), last=Max('pk')
             )
-            if not habit_logs.exists():
-                goal.current_streak = 0
-                goal.save()
+            shards += [
+                reset_streaks_shard.s(today.isoformat(), first_pk, last_pk, str(tz))
+                for first_pk, last_pk in _split_pk_range(
+                    pk_range['first'], pk_range['last'], settings.STREAK_RESET_SHARDS
+                )
+            ]
+            watermark.processed_until = now
+            watermark.save(update_fields=['processed_until'])
+
+        if shards:
+            chord(shards)(summarize_streak_resets.s())
+
+    return f"Queued {len(shards)} streak reset shards"
+
+
+@shared_task(bind=True, max_retries=3)
+def reset_streaks_shard(self, today, first_pk, last_pk, tz_name=None):
+    """
+    Reset the streak of every in-progress goal with an id between first_pk and last_pk,
+    of users in the `tz_name` timezone (TIME_ZONE by default), whose habit was not logged
+    in the previous local period (yesterday for daily habits, last month for monthly ones).
+
+    Goals are read in bounded keyset chunks of their ids, with one bulk UPDATE per chunk
+    that has stale goals.
+    Returns the number of goals scanned and reset per frequency.
+    """
+    today = date.fromisoformat(today)
+    tz = ZoneInfo(tz_name or settings.TIME_ZONE)
+
+    try:
+        with timezone.override(tz):
+            return {
+                frequency: _reset_stale_goals(frequency, today, first_pk, last_pk)
+                for frequency in PERIOD_FREQUENCIES
+            }
+    except DatabaseError as e:
+        retry_in = 5 * (2 ** self.request.retries)
+        self.retry(exc=e, countdown=retry_in)
 
 
 @shared_task
-def send_daily_reminders():
-    current_time = timezone.now().time()
+def summarize_streak_resets(shard_results):
+    summary = {}
+
+    for shard_result in shard_results:
+        for frequency, counts in shard_result.items():
+            totals = summary.setdefault(frequency, {'scanned': 0, 'reset': 0})
+            totals['scanned'] += counts['scanned']
+            totals['reset'] += counts['reset']
+
+    return summary
 
-    reminders = Reminder.objects.filter(
-        reminder_time__hour=current_time.hour,
-        reminder_time__minute=current_time.minute
-    ).select_related('habit__user')
 
-    for reminder in reminders:
-        send_reminder_email.delay(
-            user_email=reminder.habit.user.email,
-            habit_name=reminder.habit.name
+def _split_pk_range(first_pk, last_pk, shard_count):
+    shard_size = -(-(last_pk - first_pk + 1) // shard_count)
+    return [
+        (lower, min(lower + shard_size - 1, last_pk))
+        for lower in range(first_pk, last_pk + 1, shard_size)
+    ]
+
+
+def _reset_stale_goals(frequency, today, first_pk, last_pk):
+    """Reset stale goals of users in the current timezone, whose local date is `today`."""
+    chunk_size = settings.STREAK_RESET_CHUNK_SIZE
+    previous_period_start = get_previous_period_start(frequency, today)
+    previous_period_key = get_period_key(frequency, previous_period_start)
+    period_start, period_end = get_period_bounds(frequency, previous_period_start)
+
+    # Habits whose latest log falls in the current period still need a look
+    # at the log table to tell whether the previous period was logged too.
+    period_logs = HabitLog.objects.filter(
+        habit=OuterRef('habit'),
+        completed_at__gte=period_start,
+        completed_at__lt=period_end,
+    )
+    stale = Q(current_streak__gt=0) & (
+        Q(habit__last_period_key__isnull=True)
+        | Q(habit__last_period_key__lt=previous_period_key)
+        | (Q(habit__last_period_key__gt=previous_period_key) & ~Exists(period_logs))
+    )
+    goals = Goal.objects.filter(
+        status='in_progress',
+        habit__frequency=frequency,
+        habit__deleted_at__isnull=True,
+        habit__user__timezone=timezone.get_current_timezone(),
+        pk__lte=last_pk,
+    ).annotate(
+        is_stale=ExpressionWrapper(stale, output_field=BooleanField())
+    ).order_by('pk')
+
+    counts = {'scanned': 0, 'reset': 0}
+    after_pk = first_pk - 1
+
+    # Keyset chunks over the goals that exist, so the query count follows the number of
+    # goals of the timezone rather than the width of the id range.
+    while True:
+        chunk = list(
+            goals.filter(pk__gt=after_pk)
+            .values_list('pk', 'habit__user_id', 'is_stale')[:chunk_size]
         )
+        if not chunk:
+            return counts
+
+        after_pk = chunk[-1][0]
+        stale_ids = [pk for pk, _, is_stale in chunk if is_stale]
+        counts['scanned'] += len(chunk)
+        if not stale_ids:
+            continue
+        # Goals logged since the read stay untouched, as the filter is checked again.
+        counts['reset'] += Goal.objects.filter(stale, pk__in=stale_ids).update(current_streak=0)
+        # The bulk UPDATE fires no signals, so the owners' cached dashboards are bumped here.
+        for user_id in {user_id for _, user_id, is_stale in chunk if is_stale}:
+            bump_dashboard_version(user_id)
+
+
+@shared_task
+def manage_habit_log_partitions():
+    """
+    Create upcoming habit log partitions and expire old ones when HABIT_LOG_PARTITIONING
+    is enabled and the table has been converted.
+    """
+    if not settings.HABIT_LOG_PARTITIONING or not is_partitioned():
+        return "Habit log partitioning is disabled"
+
+    created = ensure_partitions(settings.HABIT_LOG_PARTITION_MONTHS_AHEAD)
+    expired = []
+    if settings.HABIT_LOG_RETENTION_MONTHS:
+        expired = expire_partitions(
+            settings.HABIT_LOG_RETENTION_MONTHS, settings.HABIT_LOG_DROP_EXPIRED_PARTITIONS
+        )
+
+    return f"Created {len(created)} and expired {len(expired)} habit log partitions"
+
+
+def _minute_ranges(first, last):
+    """
+    Split the minutes from `first` to `last`, both included, into
+    (UTC date, first minute of the day, last minute of the day) ranges.
+    """
+    ranges = []
+    while first <= last:
+        end = min(last, first.replace(hour=23, minute=59))
+        ranges.append(
+            (first.date(), first.hour * 60 + first.minute, end.hour * 60 + end.minute)
+        )
+        first = end + timedelta(minutes=1)
+    return ranges
+
+
+def _claim_due_reminders(now):
+    """
+    Record a dispatch for every reminder due after the watermark and up to `now` that was
+    not dispatched on its owner's local date yet, then move the watermark to `now`. Must
+    run in a transaction: the locked watermark row serializes concurrent runs.
+    Returns the ids of the claimed reminders.
+    """
+    watermark, _ = TaskWatermark.objects.select_for_update().get_or_create(
+        name=REMINDER_WATERMARK, defaults={'processed_until': now - timedelta(minutes=1)}
+    )
+    # Ranges of a single day at most, so each minute of the day maps to one UTC date.
+    catch_up_minutes = min(settings.REMINDER_MAX_CATCH_UP_MINUTES, 1439)
+    first = max(
+        watermark.processed_until + timedelta(minutes=1), now - timedelta(minutes=catch_up_minutes)
+    )
+    ranges = _minute_ranges(first, now)
+
+    if not ranges:
+        return []
+
+    candidates = Reminder.objects.filter(
+        reduce(operator.or_, (Q(utc_minute_of_day__range=(lo, hi)) for _, lo, hi in ranges)),
+        habit__deleted_at__isnull=True,
+    ).annotate(
+        due_date=Case(
+            *(When(utc_minute_of_day__range=(lo, hi), then=Value(day)) for day, lo, hi in ranges),
+            output_field=DateField(),
+        )
+    ).values_list('pk', 'due_date', 'utc_minute_of_day', 'habit__user__timezone')
+
+    # A reminder's UTC minute moves with DST, so it is sent once per local date of its
+    # owner rather than once per UTC date.
+    due = {
+        (pk, (
+            datetime.combine(due_date, time.min, tzinfo=ZoneInfo('UTC'))
+            + timedelta(minutes=utc_minute_of_day)
+        ).astimezone(tz).date())
+        for pk, due_date, utc_minute_of_day, tz in candidates
+    }
+    if due:
+        due -= set(ReminderDispatch.objects.filter(
+            reminder__in={pk for pk, _ in due}, date__in={day for _, day in due}
+        ).values_list('reminder_id', 'date'))
+
+    ReminderDispatch.objects.bulk_create(
+        [ReminderDispatch(reminder_id=pk, date=day) for pk, day in due], ignore_conflicts=True
+    )
+    watermark.processed_until = now
+    watermark.save(update_fields=['processed_until'])
 
-    return f"Queued {reminders.count()} reminder emails"
+    return [pk for pk, _ in due]
+
+
+@shared_task
+def send_daily_reminders():
+    """
+    Queue the reminder emails due since the previous run, looking back at most
+    REMINDER_MAX_CATCH_UP_MINUTES minutes, as send_reminder_batch tasks of up to
+    REMINDER_BATCH_SIZE recipients each. A reminder is queued at most once per local date
+    of its owner, so stalled, repeated or overlapping runs neither lose nor duplicate
+    reminders. Batches are queued before the claim commits: when the broker cannot take
+    them, the claim is rolled back and the next run tries again.
+
+    Users in digest mode get a single email naming all their due habits, everyone else
+    one email per habit.
+    """
+    with transaction.atomic():
+        reminder_ids = _claim_due_reminders(timezone.now().replace(second=0, microsecond=0))
+
+        emails = Reminder.objects.filter(pk__in=reminder_ids).annotate(
+            email_group=Case(
+                When(habit__user__reminder_digest=True, then=Value(0)),
+                default='habit_id',
+                output_field=BigIntegerField(),
+            )
+        ).values('habit__user__email', 'email_group').annotate(
+            habit_names=ArrayAgg('habit__name', ordering='habit__name')
+        ).order_by('habit__user__email', 'email_group')
+
+        recipients = [
+            {'user_email': email['habit__user__email'], 'habit_names': email['habit_names']}
+            for email in emails
+        ]
+        batch_size = settings.REMINDER_BATCH_SIZE
+
+        for start in range(0, len(recipients), batch_size):
+            send_reminder_batch.delay(recipients[start:start + batch_size])
+
+    return f"Queued {len(recipients)} reminder emails"
+
+
+@shared_task
+def prune_reminder_dispatches():
+    """Delete reminder dispatch records older than REMINDER_DISPATCH_RETENTION_DAYS days."""
+    cutoff = timezone.now().date() - timedelta(days=settings.REMINDER_DISPATCH_RETENTION_DAYS)
+    deleted, _ = ReminderDispatch.objects.filter(date__lt=cutoff).delete()
+
+    return f"Deleted {deleted} reminder dispatches"
+
+
+@shared_task
+def sync_reminder_utc_minutes():
+    """
+    Recompute the UTC minute of every reminder from its user's timezone, one UPDATE per
+    timezone in use, so reminders keep their local time across DST transitions.
+    """
+    timezones = User.objects.filter(habits__reminder__isnull=False).values_list(
+        'timezone', flat=True
+    ).distinct()
+    updated = sum(Reminder.objects.sync_utc_minute_of_day(tz) for tz in timezones)
+
+    return f"Moved {updated} reminders to a new UTC minute"
+
+
+@shared_task(rate_limit='100/m')
+def send_reminder_batch(recipients):
+    """
+    Send the reminders of a batch as a single SendGrid request with one personalization
+    per recipient. SendGrid accepts or rejects a request as a whole, so when it fails each
+    recipient is handed to send_reminder_email, which sends and retries on its own.
+    """
+    message = Mail(
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        html_content=REMINDER_HTML.format(reminder=REMINDER_TAG)
+    )
+    for recipient in recipients:
+        subject, reminder = render_reminder(recipient['habit_names'])
+        personalization = Personalization()
+        personalization.add_to(To(recipient['user_email']))
+        personalization.subject = subject
+        personalization.add_substitution(Substitution(REMINDER_TAG, reminder))
+        message.add_personalization(personalization)
+
+    try:
+        response = sg_client.send(message)
+    except Exception:
+        for recipient in recipients:
+            send_reminder_email.delay(**recipient)
+        return f"Batch of {len(recipients)} reminders failed, queued them one by one"
+
+    return f"Sent {len(recipients)} reminders - Status: {response.status_code}"
 
 
 @shared_task(rate_limit='100/m', bind=True, max_retries=3)
-def send_reminder_email(self, user_email, habit_name):
+def send_reminder_email(self, user_email, habit_names):
+    subject, reminder = render_reminder(habit_names)
     message = Mail(
         from_email=settings.DEFAULT_FROM_EMAIL,
         to_emails=user_email,
-        subject=f"Reminder: Time for your habit - {habit_name}",
-        html_content=f"""
-            <h2>Habit Reminder</h2>
-            <p>Hi,</p>
-            <p>This is a reminder to complete your habit: <strong>{habit_name}</strong></p>
-            <p>Keep up the good work!</p>
-        """
+        subject=subject,
+        html_content=REMINDER_HTML.format(reminder=reminder)
     )
 
     try:
@@ -80,3 +397,85 @@ def send_reminder_email(self, user_email, habit_name):
     except Exception as e:
         retry_in = 5 * (2 ** self.request.retries)
         self.retry(exc=e, countdown=retry_in)
+
+
+@shared_task(bind=True, max_retries=3)
+def purge_habit(self, habit_id):
+    """
+    Delete the rows of a soft-deleted habit in batches of HABIT_PURGE_BATCH_SIZE, then the
+    habit itself. After HABIT_PURGE_MAX_BATCHES batches the task queues itself again so no
+    single run holds a worker for long; a failed run retries and resumes where it stopped.
+    """
+    if not Habit.all_objects.filter(pk=habit_id, deleted_at__isnull=False).exists():
+        return f"Habit {habit_id} is not waiting to be purged"
+
+    try:
+        deleted, _, finished = purge_habit_rows(
+            habit_id, settings.HABIT_PURGE_BATCH_SIZE, settings.HABIT_PURGE_MAX_BATCHES
+        )
+    except DatabaseError as exc:
+        raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+
+    if not finished:
+        purge_habit.delay(habit_id)
+        return f"Deleted {deleted} rows of habit {habit_id}, continuing"
+
+    return f"Purged habit {habit_id} ({deleted} rows)"
+
+
+@shared_task(bind=True, max_retries=3)
+def purge_user(self, user_id):
+    """
+    Purge every habit of a soft-deleted user with the same batch budget as purge_habit,
+    then delete the user.
+    """
+    if not User.objects.filter(pk=user_id, deleted_at__isnull=False).exists():
+        return f"User {user_id} is not waiting to be purged"
+
+    Habit.all_objects.filter(user_id=user_id, deleted_at__isnull=True).update(
+        deleted_at=timezone.now()
+    )
+    batches_left = settings.HABIT_PURGE_MAX_BATCHES
+    deleted = 0
+
+    try:
+        for habit_id in Habit.all_objects.filter(user_id=user_id).values_list('pk', flat=True):
+            rows, batches, finished = purge_habit_rows(
+                habit_id, settings.HABIT_PURGE_BATCH_SIZE, batches_left
+            )
+            deleted += rows
+            batches_left -= batches
+            if not finished or batches_left <= 0:
+                purge_user.delay(user_id)
+                return f"Deleted {deleted} rows of user {user_id}, continuing"
+
+        deleted += User.objects.filter(pk=user_id).delete()[0]
+    except DatabaseError as exc:
+        raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+
+    return f"Purged user {user_id} ({deleted} rows)"
+
+
+@shared_task
+def resume_purges():
+    """
+    Queue the purge of habits and users that were soft-deleted more than
+    HABIT_PURGE_RESUME_AFTER minutes ago and are still present, e.g. after a lost task.
+    """
+    deleted_before = timezone.now() - timedelta(minutes=settings.HABIT_PURGE_RESUME_AFTER)
+    user_ids = list(
+        User.objects.filter(deleted_at__lt=deleted_before)
+        .values_list('pk', flat=True)
+    )
+    habit_ids = list(
+        Habit.all_objects.filter(deleted_at__lt=deleted_before)
+        .exclude(user_id__in=user_ids)
+        .values_list('pk', flat=True)
+    )
+
+    for user_id in user_ids:
+        purge_user.delay(user_id)
+    for habit_id in habit_ids:
+        purge_habit.delay(habit_id)
+
+    return f"Resumed purges of {len(user_ids)} users and {len(habit_ids)} habits"
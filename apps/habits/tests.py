@@ -1,8 +1,40 @@
+import base64
+import csv
+import json
 import pytest
+import threading
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from types import SimpleNamespace
+from asgiref.sync import async_to_sync
+from io import StringIO
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, IntegrityError, connection, connections
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Max, Min
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from apps.habits.models import Habit, Goal, HabitLog, Reminder
+from apps.habits.models import (
+    Habit, Goal, HabitLog, HabitPeriodStat, Reminder, ReminderDispatch, TaskWatermark
+)
+from apps.habits import async_views, cache as habits_cache, deletion, partitions, tasks
+from apps.habits.streaks import compute_streaks
+from apps.habits.tasks import (
+    reset_streaks_for_inactive_habits, reset_streaks_shard, summarize_streak_resets
+)
+from habit_tracker.celery import app as celery_app
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
 
 
 @pytest.fixture
@@ -95,8 +127,8 @@ class TestHabitAPI:
         response = authenticated_api_client.get(habit_url)
 
         assert response.status_code == 200
-        assert len(response.data) == 1
-        assert response.data[0]['name'] == test_habit.name
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['name'] == test_habit.name
 
     def test_retrieve_habit(self, authenticated_api_client, test_habit):
         url = reverse('habits:habit-detail', args=[test_habit.id])
@@ -153,6 +185,138 @@ class TestHabitAPI:
         assert response.data[0]['current_goal'] is None
         assert response.data[0]['today_log']['id'] == test_habit_log.id
 
+    def test_dashboard_monthly_habit_with_log(
+        self, authenticated_api_client, test_monthly_habit_log, habit_dashboard_url
+    ):
+        response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert response.status_code == 200
+        assert response.data[0]['today_log']['id'] == test_monthly_habit_log.id
+
+    def test_dashboard_habit_with_reminder(
+        self, authenticated_api_client, habit_reminder, habit_dashboard_url
+    ):
+        response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert response.status_code == 200
+        assert response.data[0]['reminder']['id'] == habit_reminder.id
+
+    @pytest.mark.parametrize('habit_count', [1, 10])
+    def test_dashboard_query_count_is_constant(
+        self, authenticated_api_client, test_user, habit_dashboard_url,
+        django_assert_num_queries, habit_count
+    ):
+        for i in range(habit_count):
+            habit = Habit.objects.create(user=test_user, name=f'Habit {i}')
+            Goal.objects.create(habit=habit)
+            HabitLog.objects.create(habit=habit)
+            Reminder.objects.create(habit=habit, reminder_time='08:00:00')
+
+        with django_assert_num_queries(3):
+            response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert len(response.data) == habit_count
+        assert all(habit['current_goal']['current_streak'] == 1 for habit in response.data)
+        assert all(habit['today_log'] for habit in response.data)
+        assert all(habit['reminder'] for habit in response.data)
+
+
+@pytest.mark.django_db
+class TestDashboardCache:
+    def test_dashboard_returns_etag(
+        self, authenticated_api_client, test_habit, habit_dashboard_url
+    ):
+        response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert response.status_code == 200
+        assert response['ETag'].startswith('"')
+
+    def test_unchanged_dashboard_is_not_modified(
+        self, authenticated_api_client, test_habit, habit_dashboard_url, django_assert_num_queries
+    ):
+        etag = authenticated_api_client.get(habit_dashboard_url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = authenticated_api_client.get(habit_dashboard_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+    def test_cached_dashboard_skips_database(
+        self, authenticated_api_client, test_habit, habit_dashboard_url, django_assert_num_queries
+    ):
+        first_response = authenticated_api_client.get(habit_dashboard_url)
+
+        with django_assert_num_queries(0):
+            response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert response.data == first_response.data
+
+    @pytest.mark.parametrize('change', [
+        lambda habit: HabitLog.objects.create(habit=habit),
+        lambda habit: Goal.objects.create(habit=habit),
+        lambda habit: Reminder.objects.create(habit=habit, reminder_time='08:00:00'),
+        lambda habit: Habit.objects.filter(pk=habit.pk).first().save(),
+    ])
+    def test_change_invalidates_dashboard(
+        self, authenticated_api_client, test_habit, habit_dashboard_url, change,
+        django_capture_on_commit_callbacks
+    ):
+        etag = authenticated_api_client.get(habit_dashboard_url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            change(test_habit)
+        response = authenticated_api_client.get(habit_dashboard_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_deleted_habit_leaves_dashboard(
+        self, authenticated_api_client, test_habit, test_habit_log, habit_dashboard_url,
+        django_capture_on_commit_callbacks
+    ):
+        authenticated_api_client.get(habit_dashboard_url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            test_habit.delete()
+        response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert response.data == []
+
+    def test_dashboard_version_changes_only_on_commit(
+        self, authenticated_api_client, test_habit, habit_dashboard_url,
+        django_capture_on_commit_callbacks
+    ):
+        etag = authenticated_api_client.get(habit_dashboard_url)['ETag']
+        version = habits_cache.get_dashboard_version(test_habit.user_id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitLog.objects.create(habit=test_habit)
+            in_transaction = authenticated_api_client.get(
+                habit_dashboard_url, HTTP_IF_NONE_MATCH=etag
+            )
+
+            assert habits_cache.get_dashboard_version(test_habit.user_id) == version
+
+        assert habits_cache.get_dashboard_version(test_habit.user_id) != version
+        response = authenticated_api_client.get(habit_dashboard_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert in_transaction.status_code == 304
+        assert response.status_code == 200
+        assert response.data[0]['today_log'] is not None
+
+    def test_day_rollover_invalidates_dashboard(
+        self, monkeypatch, authenticated_api_client, test_habit, habit_dashboard_url
+    ):
+        etag = authenticated_api_client.get(habit_dashboard_url)['ETag']
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        monkeypatch.setattr(habits_cache, 'timezone', SimpleNamespace(localdate=lambda: tomorrow))
+
+        response = authenticated_api_client.get(habit_dashboard_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
 
 @pytest.mark.django_db
 class TestGoalAPI:
@@ -170,8 +334,8 @@ class TestGoalAPI:
         response = authenticated_api_client.get(goal_url)
 
         assert response.status_code == 200
-        assert len(response.data) == 1
-        assert response.data[0]['target_streak'] == test_goal.target_streak
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['target_streak'] == test_goal.target_streak
 
     def test_retrieve_goal(self, authenticated_api_client, test_goal):
         url = reverse('habits:goal-detail', args=[test_goal.id])
@@ -234,12 +398,42 @@ class TestHabitLogAPI:
 
         assert test_goal.current_streak == initial_streak + 1
 
+    def test_create_habit_log_completes_goal_at_target(
+        self, authenticated_api_client, habit_log_url, test_habit
+    ):
+        goal = Goal.objects.create(habit=test_habit, current_streak=9, target_streak=10)
+        response = authenticated_api_client.post(habit_log_url, {'habit': test_habit.id})
+
+        assert response.status_code == 201
+
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 10
+        assert goal.status == 'completed'
+
     def test_list_habit_logs(self, authenticated_api_client, habit_log_url, test_habit_log):
         response = authenticated_api_client.get(habit_log_url)
 
         assert response.status_code == 200
-        assert len(response.data) == 1
-        assert response.data[0]['habit'] == test_habit_log.habit.id
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['habit'] == test_habit_log.habit.id
+
+    def test_list_habit_logs_is_cursor_paginated(
+        self, authenticated_api_client, habit_log_url, test_habit
+    ):
+        now = timezone.now()
+        logs = [create_log_at(test_habit, now - timedelta(days=days)) for days in range(5)]
+
+        seen = []
+        url = f'{habit_log_url}?page_size=2'
+        while url:
+            response = authenticated_api_client.get(url)
+            assert response.status_code == 200
+            assert len(response.data['results']) <= 2
+            seen += [log['id'] for log in response.data['results']]
+            url = response.data['next']
+
+        assert seen == [log.id for log in logs]
 
 
 @pytest.fixture
@@ -348,6 +542,25 @@ class TestValidation:
         assert 'habit' in response.data
         assert response.data['habit'] == ['You can only log daily habit once per day.']
 
+    def test_log_stores_period_key(self, test_habit_log, test_monthly_habit_log):
+        today = timezone.localdate()
+
+        assert test_habit_log.period_key == today.toordinal()
+        assert test_monthly_habit_log.period_key == today.year * 12 + today.month - 1
+
+    def test_database_rejects_second_log_in_period(self, test_habit, test_habit_log):
+        with pytest.raises(IntegrityError):
+            HabitLog.objects.create(habit=test_habit)
+
+    def test_habit_without_period_can_log_repeatedly(
+        self, authenticated_api_client, test_user, habit_log_url
+    ):
+        habit = Habit.objects.create(user=test_user, name='Weekly Habit', frequency='weekly')
+
+        for _ in range(2):
+            response = authenticated_api_client.post(habit_log_url, {'habit': habit.id})
+            assert response.status_code == 201
+
     def test_one_log_per_month_if_monthly(
         self, authenticated_api_client, test_monthly_habit, test_monthly_habit_log, habit_log_url
     ):
@@ -357,3 +570,1528 @@ class TestValidation:
         assert response.status_code == 400
         assert 'habit' in response.data
         assert response.data['habit'] == ['You can only log monthly habit once per month.']
+
+
+def create_log_at(habit, completed_at):
+    return HabitLog.objects.create(habit=habit, completed_at=completed_at)
+
+
+def run_streak_reset_shard():
+    pk_range = Goal.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    return reset_streaks_shard(
+        timezone.localdate().isoformat(), pk_range['first'], pk_range['last']
+    )
+
+
+@pytest.fixture
+def eager_celery(monkeypatch):
+    monkeypatch.setattr(celery_app.conf, 'task_always_eager', True)
+
+
+@pytest.mark.django_db
+class TestResetStreaksTask:
+    def test_resets_daily_goal_without_log_yesterday(self, test_habit, test_goal):
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=3)
+
+        result = run_streak_reset_shard()
+        test_goal.refresh_from_db()
+
+        assert test_goal.current_streak == 0
+        assert result['daily'] == {'scanned': 1, 'reset': 1}
+
+    def test_keeps_daily_goal_with_log_yesterday(self, test_habit, test_goal):
+        create_log_at(test_habit, timezone.now() - timedelta(days=1))
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=3)
+
+        result = run_streak_reset_shard()
+        test_goal.refresh_from_db()
+
+        assert test_goal.current_streak == 3
+        assert result['daily'] == {'scanned': 1, 'reset': 0}
+
+    def test_resets_daily_goal_logged_today_but_not_yesterday(self, test_habit, test_goal):
+        create_log_at(test_habit, timezone.now() - timedelta(days=2))
+        HabitLog.objects.create(habit=test_habit)
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=3)
+
+        result = run_streak_reset_shard()
+        test_goal.refresh_from_db()
+
+        assert test_goal.current_streak == 0
+        assert result['daily'] == {'scanned': 1, 'reset': 1}
+
+    def test_resets_monthly_goal_without_log_last_month(self, test_monthly_habit):
+        goal = Goal.objects.create(habit=test_monthly_habit, current_streak=2)
+
+        result = run_streak_reset_shard()
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 0
+        assert result['monthly'] == {'scanned': 1, 'reset': 1}
+
+    def test_keeps_monthly_goal_with_log_last_month(self, test_monthly_habit):
+        last_month = timezone.now().replace(day=1) - timedelta(days=1)
+        create_log_at(test_monthly_habit, last_month)
+        goal = Goal.objects.create(habit=test_monthly_habit, current_streak=2)
+
+        result = run_streak_reset_shard()
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 2
+        assert result['monthly'] == {'scanned': 1, 'reset': 0}
+
+    def test_reset_refreshes_cached_dashboard(
+        self, authenticated_api_client, habit_dashboard_url, test_goal,
+        django_capture_on_commit_callbacks
+    ):
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=3)
+        cached = authenticated_api_client.get(habit_dashboard_url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            run_streak_reset_shard()
+        response = authenticated_api_client.get(habit_dashboard_url)
+
+        assert cached.data[0]['current_goal']['current_streak'] == 3
+        assert response.data[0]['current_goal']['current_streak'] == 0
+
+    def test_processes_goals_in_chunks(self, settings, test_user):
+        settings.STREAK_RESET_CHUNK_SIZE = 2
+        goals = [
+            Goal.objects.create(
+                habit=Habit.objects.create(user=test_user, name=f'Habit {i}'),
+                current_streak=1
+            )
+            for i in range(5)
+        ]
+
+        result = run_streak_reset_shard()
+
+        assert result['daily'] == {'scanned': 5, 'reset': 5}
+        assert not Goal.objects.filter(pk__in=[g.pk for g in goals], current_streak__gt=0).exists()
+
+    def test_query_count_does_not_grow_with_id_gaps(self, settings, test_user):
+        settings.STREAK_RESET_CHUNK_SIZE = 2
+        query_counts = []
+        for gap in (10, 1000):
+            Goal.objects.all().delete()
+            first = Goal.objects.create(
+                habit=Habit.objects.create(user=test_user, name=f'First {gap}'), current_streak=1
+            )
+            Goal.objects.create(
+                pk=first.pk + gap,
+                habit=Habit.objects.create(user=test_user, name=f'Last {gap}'),
+                current_streak=1,
+            )
+            with CaptureQueriesContext(connection) as queries:
+                result = run_streak_reset_shard()
+            query_counts.append(len(queries))
+
+            assert result['daily'] == {'scanned': 2, 'reset': 2}
+
+        assert query_counts[0] == query_counts[1]
+
+    @pytest.fixture
+    def after_utc_midnight(self, monkeypatch):
+        now = timezone.now().replace(hour=0, minute=1)
+        monkeypatch.setattr(timezone, 'now', lambda: now)
+        return now
+
+    def test_dispatcher_fans_out_shards(
+        self, settings, eager_celery, after_utc_midnight, test_user
+    ):
+        settings.STREAK_RESET_SHARDS = 3
+        for i in range(5):
+            Goal.objects.create(
+                habit=Habit.objects.create(user=test_user, name=f'Habit {i}'),
+                current_streak=1
+            )
+
+        result = reset_streaks_for_inactive_habits()
+
+        assert result == 'Queued 3 streak reset shards'
+        assert not Goal.objects.filter(current_streak__gt=0).exists()
+
+    def test_dispatcher_catches_up_after_missed_run(
+        self, monkeypatch, eager_celery, test_goal
+    ):
+        now = timezone.now().replace(hour=3, minute=1)
+        monkeypatch.setattr(timezone, 'now', lambda: now)
+        TaskWatermark.objects.create(
+            name='reset_streaks_for_inactive_habits:UTC', processed_until=now - timedelta(hours=5)
+        )
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=1)
+
+        first = reset_streaks_for_inactive_habits()
+        test_goal.refresh_from_db()
+        second = reset_streaks_for_inactive_habits()
+
+        assert first == 'Queued 1 streak reset shards'
+        assert test_goal.current_streak == 0
+        assert second == 'Queued 0 streak reset shards'
+
+    def test_dispatcher_waits_for_local_midnight(
+        self, eager_celery, after_utc_midnight, test_goal, other_user
+    ):
+        other_user.timezone = 'America/New_York'
+        other_user.save()
+        other_goal = Goal.objects.create(
+            habit=Habit.objects.create(user=other_user, name='Evening walk'), current_streak=1
+        )
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=1)
+
+        result = reset_streaks_for_inactive_habits()
+        test_goal.refresh_from_db()
+        other_goal.refresh_from_db()
+
+        assert result == 'Queued 1 streak reset shards'
+        assert test_goal.current_streak == 0
+        assert other_goal.current_streak == 1
+
+    def test_keeps_goal_logged_yesterday_in_local_time(self, test_user, test_habit, test_goal):
+        test_user.timezone = 'Asia/Tokyo'
+        test_user.save()
+        tokyo = ZoneInfo('Asia/Tokyo')
+        today = timezone.localdate(timezone.now(), tokyo)
+        # 01:00 yesterday in Tokyo is still the day before yesterday in UTC
+        create_log_at(
+            test_habit,
+            datetime.combine(today - timedelta(days=1), time(1), tzinfo=tokyo)
+        )
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=3)
+
+        result = reset_streaks_shard(today.isoformat(), test_goal.pk, test_goal.pk, 'Asia/Tokyo')
+        test_goal.refresh_from_db()
+
+        assert test_goal.current_streak == 3
+        assert result['daily'] == {'scanned': 1, 'reset': 0}
+
+    def test_failed_shard_retries_on_its_own(self, monkeypatch, eager_celery, test_goal):
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=1)
+        reset_stale_goals = tasks._reset_stale_goals
+        calls = []
+
+        def flaky_reset_stale_goals(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise DatabaseError('connection lost')
+            return reset_stale_goals(*args)
+
+        monkeypatch.setattr(tasks, '_reset_stale_goals', flaky_reset_stale_goals)
+
+        result = reset_streaks_shard.apply(
+            args=(timezone.localdate().isoformat(), test_goal.pk, test_goal.pk)
+        )
+
+        assert result.get()['daily'] == {'scanned': 1, 'reset': 1}
+
+    def test_summarize_streak_resets(self):
+        shard_results = [
+            {'daily': {'scanned': 3, 'reset': 1}, 'monthly': {'scanned': 1, 'reset': 0}},
+            {'daily': {'scanned': 2, 'reset': 2}, 'monthly': {'scanned': 0, 'reset': 0}},
+        ]
+
+        assert summarize_streak_resets(shard_results) == {
+            'daily': {'scanned': 5, 'reset': 3},
+            'monthly': {'scanned': 1, 'reset': 0},
+        }
+
+
+@pytest.mark.django_db
+class TestHabitLastCompleted:
+    def test_log_create_updates_last_completed(self, test_habit):
+        log = HabitLog.objects.create(habit=test_habit)
+        test_habit.refresh_from_db()
+
+        assert test_habit.last_completed_at == log.completed_at
+        assert test_habit.last_period_key == timezone.localdate().toordinal()
+
+    def test_log_delete_rewinds_last_completed(self, test_habit):
+        previous_log = create_log_at(test_habit, timezone.now() - timedelta(days=1))
+        log = HabitLog.objects.create(habit=test_habit)
+
+        log.delete()
+        test_habit.refresh_from_db()
+
+        assert test_habit.last_completed_at == previous_log.completed_at
+        assert test_habit.last_period_key == previous_log.completed_at.date().toordinal()
+
+    def test_backfill_last_completed(self, test_habit, test_monthly_habit):
+        log = HabitLog.objects.create(habit=test_habit)
+        Habit.objects.update(last_completed_at=None, last_period_key=None)
+
+        call_command('backfill_last_completed', batch_size=1, stdout=StringIO())
+        test_habit.refresh_from_db()
+        test_monthly_habit.refresh_from_db()
+
+        assert test_habit.last_completed_at == log.completed_at
+        assert test_habit.last_period_key == log.completed_at.date().toordinal()
+        assert test_monthly_habit.last_completed_at is None
+        assert test_monthly_habit.last_period_key is None
+
+
+def create_logs_concurrently(habit, count):
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def create_log():
+        try:
+            barrier.wait()
+            HabitLog.objects.create(habit=habit)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=create_log) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentGoalStreak:
+    @pytest.fixture
+    def weekly_habit(self, test_user):
+        return Habit.objects.create(user=test_user, name='Weekly Habit', frequency='weekly')
+
+    def test_parallel_logs_do_not_lose_increments(self, weekly_habit):
+        goal = Goal.objects.create(habit=weekly_habit, target_streak=100)
+
+        create_logs_concurrently(weekly_habit, 8)
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 8
+        assert goal.status == 'in_progress'
+
+    def test_parallel_logs_complete_goal_once(self, weekly_habit):
+        goal = Goal.objects.create(habit=weekly_habit, target_streak=5)
+
+        create_logs_concurrently(weekly_habit, 8)
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 5
+        assert goal.status == 'completed'
+
+
+@pytest.mark.django_db
+class TestHabitLogFilters:
+    @pytest.fixture
+    def history(self, test_habit, test_monthly_habit):
+        now = timezone.now()
+        return {
+            'recent': create_log_at(test_habit, now - timedelta(days=1)),
+            'old': create_log_at(test_habit, now - timedelta(days=40)),
+            'monthly': create_log_at(test_monthly_habit, now),
+        }
+
+    def get_log_ids(self, client, url, **params):
+        response = client.get(url, params)
+        assert response.status_code == 200
+        return {log['id'] for log in response.data['results']}
+
+    def test_filter_by_habit(self, authenticated_api_client, habit_log_url, test_habit, history):
+        log_ids = self.get_log_ids(authenticated_api_client, habit_log_url, habit=test_habit.id)
+
+        assert log_ids == {history['recent'].id, history['old'].id}
+
+    def test_filter_by_time_range(self, authenticated_api_client, habit_log_url, history):
+        now = timezone.now()
+        log_ids = self.get_log_ids(
+            authenticated_api_client, habit_log_url,
+            completed_after=(now - timedelta(days=30)).isoformat(),
+            completed_before=(now - timedelta(hours=1)).isoformat(),
+        )
+
+        assert log_ids == {history['recent'].id}
+
+    def test_filter_by_frequency(self, authenticated_api_client, habit_log_url, history):
+        log_ids = self.get_log_ids(authenticated_api_client, habit_log_url, frequency='monthly')
+
+        assert log_ids == {history['monthly'].id}
+
+    def test_filter_by_other_users_habit_is_empty(
+        self, authenticated_api_client, habit_log_url, other_user_habit
+    ):
+        HabitLog.objects.create(habit=other_user_habit)
+
+        assert not self.get_log_ids(
+            authenticated_api_client, habit_log_url, habit=other_user_habit.id
+        )
+
+    def test_unknown_frequency_is_rejected(self, authenticated_api_client, habit_log_url):
+        response = authenticated_api_client.get(habit_log_url, {'frequency': 'bogus'})
+
+        assert response.status_code == 400
+        assert 'frequency' in response.data
+
+    def test_invalid_time_range_is_rejected(self, authenticated_api_client, habit_log_url):
+        now = timezone.now()
+        response = authenticated_api_client.get(habit_log_url, {
+            'completed_after': now.isoformat(),
+            'completed_before': (now - timedelta(days=1)).isoformat(),
+        })
+
+        assert response.status_code == 400
+        assert 'completed_before' in response.data
+
+    def test_habit_history_uses_habit_completed_at_index(self, test_habit, history):
+        now = timezone.now()
+        queryset = HabitLog.objects.filter_history(
+            habit=test_habit.id,
+            completed_after=now - timedelta(days=30),
+            completed_before=now,
+        ).order_by('-completed_at')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+
+        assert 'habitlog_habit_completed_idx' in plan
+
+    def test_log_list_pages_by_user_completed_at_index(
+        self, authenticated_api_client, habit_log_url, history, other_user_habit
+    ):
+        create_log_at(other_user_habit, timezone.now())
+
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_api_client.get(habit_log_url)
+        log_query = next(query['sql'] for query in queries if 'habits_habitlog' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            cursor.execute(f'EXPLAIN {log_query}')
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+
+        assert 'habitlog_user_completed_id_idx' in plan
+        assert 'Sort' not in plan
+
+
+@pytest.mark.django_db
+class TestHabitPeriodStats:
+    @pytest.fixture
+    def weekly_habit(self, test_user):
+        return Habit.objects.create(user=test_user, name='Weekly Habit', frequency='weekly')
+
+    def get_rollup(self, habit):
+        return dict(habit.period_stats.values_list('period', 'completions'))
+
+    def test_log_create_increments_rollup(self, weekly_habit):
+        HabitLog.objects.create(habit=weekly_habit)
+        HabitLog.objects.create(habit=weekly_habit)
+
+        assert self.get_rollup(weekly_habit) == {timezone.localdate(): 2}
+
+    def test_log_delete_decrements_rollup(self, weekly_habit):
+        log = HabitLog.objects.create(habit=weekly_habit)
+        HabitLog.objects.create(habit=weekly_habit)
+
+        log.delete()
+
+        assert self.get_rollup(weekly_habit) == {timezone.localdate(): 1}
+
+    def test_rebuild_period_stats(self, test_habit, weekly_habit):
+        now = timezone.now()
+        create_log_at(test_habit, now - timedelta(days=3))
+        create_log_at(test_habit, now)
+        create_log_at(weekly_habit, now)
+        create_log_at(weekly_habit, now)
+        HabitPeriodStat.objects.all().delete()
+        HabitPeriodStat.objects.create(habit=test_habit, period=timezone.localdate(), completions=9)
+
+        call_command('rebuild_period_stats', batch_size=1, stdout=StringIO())
+
+        assert self.get_rollup(test_habit) == {
+            timezone.localdate(now - timedelta(days=3)): 1,
+            timezone.localdate(now): 1,
+        }
+        assert self.get_rollup(weekly_habit) == {timezone.localdate(now): 2}
+
+    def test_stats_endpoint(self, authenticated_api_client, test_habit):
+        Habit.objects.filter(pk=test_habit.pk).update(
+            created_at=timezone.now() - timedelta(days=100)
+        )
+        today = timezone.localdate()
+        periods = [today - timedelta(days=days) for days in (0, 1, 2, 40)]
+        HabitPeriodStat.objects.bulk_create([
+            HabitPeriodStat(habit=test_habit, period=period, completions=1) for period in periods
+        ])
+        url = reverse('habits:habit-stats', args=[test_habit.id])
+
+        response = authenticated_api_client.get(url, {'days': 10})
+
+        assert response.status_code == 200
+        assert response.data['total_completions'] == 4
+        assert response.data['this_month_completions'] == sum(
+            period >= today.replace(day=1) for period in periods
+        )
+        assert response.data['window']['completions'] == 3
+        assert response.data['window']['expected'] == 10
+        assert response.data['window']['completion_rate'] == 0.3
+
+    def test_stats_window_starts_at_habit_creation(self, authenticated_api_client, test_habit):
+        HabitLog.objects.create(habit=test_habit)
+        url = reverse('habits:habit-stats', args=[test_habit.id])
+
+        response = authenticated_api_client.get(url, {'days': 90})
+
+        assert response.data['window']['expected'] == 1
+        assert response.data['window']['completion_rate'] == 1
+
+    def test_stats_of_other_users_habit_not_found(
+        self, authenticated_api_client, other_user_habit
+    ):
+        url = reverse('habits:habit-stats', args=[other_user_habit.id])
+
+        response = authenticated_api_client.get(url)
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestHabitCalendar:
+    def get_calendar(self, client, habit, **params):
+        return client.get(reverse('habits:habit-calendar', args=[habit.id]), params)
+
+    def test_daily_calendar_bitset(self, authenticated_api_client, test_habit):
+        HabitPeriodStat.objects.bulk_create([
+            HabitPeriodStat(habit=test_habit, period=date(2024, 1, 1), completions=1),
+            HabitPeriodStat(habit=test_habit, period=date(2024, 1, 10), completions=1),
+            HabitPeriodStat(habit=test_habit, period=date(2024, 12, 31), completions=1),
+            HabitPeriodStat(habit=test_habit, period=date(2025, 1, 1), completions=1),
+        ])
+
+        response = self.get_calendar(authenticated_api_client, test_habit, year=2024)
+        bits = base64.b64decode(response.data['bitset'])
+
+        assert response.status_code == 200
+        assert response.data['resolution'] == 'day'
+        assert response.data['length'] == 366
+        assert len(bits) == 46
+        assert bits[0] == 0b00000001
+        assert bits[1] == 0b00000010
+        assert bits[45] == 0b00100000
+        assert sum(bin(byte).count('1') for byte in bits) == 3
+
+    def test_monthly_calendar_expanded(self, authenticated_api_client, test_monthly_habit):
+        HabitPeriodStat.objects.bulk_create([
+            HabitPeriodStat(habit=test_monthly_habit, period=date(2023, 2, 14), completions=1),
+            HabitPeriodStat(habit=test_monthly_habit, period=date(2023, 11, 2), completions=1),
+        ])
+
+        response = self.get_calendar(
+            authenticated_api_client, test_monthly_habit, year=2023, expand='true'
+        )
+
+        assert response.data['resolution'] == 'month'
+        assert response.data['length'] == 12
+        assert response.data['completed'] == ['2023-02', '2023-11']
+
+    def test_calendar_defaults_to_current_year(self, authenticated_api_client, test_habit_log):
+        response = self.get_calendar(
+            authenticated_api_client, test_habit_log.habit, expand='true'
+        )
+
+        assert response.data['year'] == timezone.localdate().year
+        assert response.data['completed'] == [timezone.localdate().isoformat()]
+
+    def test_past_year_is_cached(
+        self, authenticated_api_client, test_habit, django_assert_num_queries
+    ):
+        self.get_calendar(authenticated_api_client, test_habit, year=2020)
+
+        with django_assert_num_queries(1):
+            self.get_calendar(authenticated_api_client, test_habit, year=2020)
+
+    def test_backfilled_log_invalidates_past_year(self, authenticated_api_client, test_habit):
+        last_year = timezone.localdate().year - 1
+        self.get_calendar(authenticated_api_client, test_habit, year=last_year)
+
+        create_log_at(test_habit, timezone.now().replace(year=last_year, month=6, day=1))
+        response = self.get_calendar(
+            authenticated_api_client, test_habit, year=last_year, expand='true'
+        )
+
+        assert response.data['completed'] == [f'{last_year}-06-01']
+
+    def test_rebuild_period_stats_invalidates_past_year(
+        self, authenticated_api_client, test_habit
+    ):
+        last_year = timezone.localdate().year - 1
+        create_log_at(test_habit, timezone.now().replace(year=last_year, month=6, day=1))
+        HabitPeriodStat.objects.all().delete()
+        empty = self.get_calendar(
+            authenticated_api_client, test_habit, year=last_year, expand='true'
+        )
+
+        call_command('rebuild_period_stats', stdout=StringIO())
+        response = self.get_calendar(
+            authenticated_api_client, test_habit, year=last_year, expand='true'
+        )
+
+        assert empty.data['completed'] == []
+        assert response.data['completed'] == [f'{last_year}-06-01']
+
+
+def create_daily_logs(habit, days_ago):
+    now = timezone.now()
+    for days in days_ago:
+        create_log_at(habit, now - timedelta(days=days))
+
+
+@pytest.mark.django_db
+class TestStreakEngine:
+    def get_streaks(self, habit):
+        _, current_streak, longest_streak = compute_streaks([habit.id])[habit.id]
+        return current_streak, longest_streak
+
+    def test_current_and_longest_daily_streak(self, test_habit):
+        create_daily_logs(test_habit, [0, 1, 2, 5, 6, 7, 8])
+
+        assert self.get_streaks(test_habit) == (3, 4)
+
+    def test_streak_through_yesterday_is_current(self, test_habit):
+        create_daily_logs(test_habit, [1, 2])
+
+        assert self.get_streaks(test_habit) == (2, 2)
+
+    def test_broken_streak_is_not_current(self, test_habit):
+        create_daily_logs(test_habit, [2, 3])
+
+        assert self.get_streaks(test_habit) == (0, 2)
+
+    def test_habit_without_logs(self, test_habit):
+        assert self.get_streaks(test_habit) == (0, 0)
+
+    def test_monthly_streak(self, test_monthly_habit):
+        this_month = timezone.now().replace(day=1)
+        last_month = this_month - timedelta(days=1)
+        create_log_at(test_monthly_habit, this_month)
+        create_log_at(test_monthly_habit, last_month)
+
+        assert self.get_streaks(test_monthly_habit) == (2, 2)
+
+    def test_recompute_streaks_command(self, test_habit, test_monthly_habit, test_goal):
+        create_daily_logs(test_habit, [0, 1, 2, 5, 6, 7, 8])
+        Goal.objects.filter(pk=test_goal.pk).update(current_streak=42)
+
+        call_command('recompute_streaks', batch_size=1, stdout=StringIO())
+        test_habit.refresh_from_db()
+        test_goal.refresh_from_db()
+
+        assert test_habit.longest_streak == 4
+        assert test_goal.current_streak == 3
+        assert test_goal.status == 'in_progress'
+
+    def test_recompute_completes_goal_at_target(self, test_habit):
+        create_daily_logs(test_habit, [0, 1, 2])
+        goal = Goal.objects.create(habit=test_habit, target_streak=2)
+
+        call_command('recompute_streaks', stdout=StringIO())
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 3
+        assert goal.status == 'completed'
+
+    def test_recompute_streak_action(self, authenticated_api_client, test_habit):
+        create_daily_logs(test_habit, [1, 2, 4])
+        url = reverse('habits:habit-recompute-streak', args=[test_habit.id])
+
+        response = authenticated_api_client.post(url)
+        test_habit.refresh_from_db()
+
+        assert response.status_code == 200
+        assert response.data == {'habit': test_habit.id, 'current_streak': 2, 'longest_streak': 2}
+        assert test_habit.longest_streak == 2
+
+
+@pytest.mark.django_db
+class TestHabitLogBulkSync:
+    @pytest.fixture
+    def bulk_sync_url(self):
+        return reverse('habits:habit-log-bulk-sync')
+
+    def days_ago(self, days):
+        return (timezone.now() - timedelta(days=days)).isoformat()
+
+    def test_bulk_sync_reports_result_per_entry(
+        self, authenticated_api_client, bulk_sync_url, test_habit, test_habit_log,
+        other_user_habit
+    ):
+        entries = [
+            {'habit': test_habit.id, 'completed_at': self.days_ago(1)},
+            {'habit': test_habit.id, 'completed_at': self.days_ago(0)},
+            {'habit': test_habit.id, 'completed_at': self.days_ago(2)},
+            {'habit': test_habit.id, 'completed_at': self.days_ago(2)},
+            {'habit': other_user_habit.id, 'completed_at': self.days_ago(1)},
+            {'habit': test_habit.id, 'completed_at': 'yesterday'},
+            {'habit': test_habit.id, 'completed_at': self.days_ago(-1)},
+        ]
+
+        response = authenticated_api_client.post(bulk_sync_url, entries, format='json')
+        results = response.data['results']
+
+        assert response.status_code == 200
+        assert [result['status'] for result in results] == [
+            'created', 'duplicate', 'created', 'duplicate', 'invalid', 'invalid', 'invalid'
+        ]
+        assert [result['index'] for result in results] == list(range(len(entries)))
+        assert results[1]['errors'] == {'habit': ['You can only log daily habit once per day.']}
+        assert 'completed_at' in results[5]['errors']
+        assert set(HabitLog.objects.filter(habit=test_habit).values_list('id', flat=True)) == {
+            test_habit_log.id, results[0]['id'], results[2]['id']
+        }
+
+    def test_bulk_sync_applies_side_effects_once_per_habit(
+        self, authenticated_api_client, bulk_sync_url, test_habit, test_goal
+    ):
+        entries = [
+            {'habit': test_habit.id, 'completed_at': self.days_ago(days)} for days in range(3)
+        ]
+
+        authenticated_api_client.post(bulk_sync_url, entries, format='json')
+        test_habit.refresh_from_db()
+        test_goal.refresh_from_db()
+        latest_log = HabitLog.objects.filter(habit=test_habit).latest('completed_at')
+
+        assert test_goal.current_streak == 3
+        assert test_habit.longest_streak == 3
+        assert test_habit.last_completed_at == latest_log.completed_at
+        assert test_habit.last_period_key == latest_log.period_key
+        assert test_habit.period_stats.count() == 3
+
+    @pytest.mark.parametrize('bulk', [False, True])
+    def test_bulk_sync_advances_goal_like_single_log(
+        self, authenticated_api_client, bulk_sync_url, habit_log_url, test_habit, bulk
+    ):
+        create_daily_logs(test_habit, range(1, 31))
+        goal = Goal.objects.create(habit=test_habit, target_streak=10)
+        entry = {'habit': test_habit.id, 'completed_at': self.days_ago(0)}
+
+        if bulk:
+            authenticated_api_client.post(bulk_sync_url, [entry], format='json')
+        else:
+            authenticated_api_client.post(habit_log_url, entry, format='json')
+        goal.refresh_from_db()
+
+        assert goal.current_streak == 1
+        assert goal.status == 'in_progress'
+
+    def test_bulk_sync_query_count_does_not_grow_with_entries(
+        self, authenticated_api_client, bulk_sync_url, test_user
+    ):
+        query_counts = []
+        for entry_count in (5, 50):
+            habit = Habit.objects.create(user=test_user, name=f'Habit {entry_count}')
+            entries = [
+                {'habit': habit.id, 'completed_at': self.days_ago(days)}
+                for days in range(entry_count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                authenticated_api_client.post(bulk_sync_url, entries, format='json')
+            query_counts.append(len(queries))
+
+        assert query_counts[0] == query_counts[1]
+
+    def test_bulk_sync_requires_list(self, authenticated_api_client, bulk_sync_url, test_habit):
+        response = authenticated_api_client.post(
+            bulk_sync_url, {'habit': test_habit.id}, format='json'
+        )
+
+        assert response.status_code == 400
+
+    def test_bulk_sync_limits_entries(
+        self, settings, authenticated_api_client, bulk_sync_url, test_habit
+    ):
+        settings.HABIT_LOG_SYNC_MAX_ITEMS = 2
+        entries = [
+            {'habit': test_habit.id, 'completed_at': self.days_ago(days)} for days in range(3)
+        ]
+
+        response = authenticated_api_client.post(bulk_sync_url, entries, format='json')
+
+        assert response.status_code == 400
+        assert not HabitLog.objects.exists()
+
+
+@pytest.mark.django_db
+class TestHabitLogExport:
+    @pytest.fixture
+    def export_url(self):
+        return reverse('habits:habit-log-export')
+
+    @pytest.fixture
+    def history(self, test_habit, test_monthly_habit_log, other_user_habit):
+        logs = [
+            create_log_at(test_habit, timezone.now() - timedelta(days=days)) for days in (2, 1)
+        ]
+        create_log_at(other_user_habit, timezone.now())
+        return logs + [test_monthly_habit_log]
+
+    def test_export_streams_ndjson_oldest_first(
+        self, authenticated_api_client, export_url, history
+    ):
+        response = authenticated_api_client.get(export_url)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert 'attachment' in response['Content-Disposition']
+        assert [row['id'] for row in rows] == [
+            log.id for log in sorted(history, key=lambda log: log.completed_at)
+        ]
+        assert rows[0]['habit_name'] == history[0].habit.name
+        assert rows[0]['period_key'] == history[0].period_key
+
+    def test_export_streams_csv(self, authenticated_api_client, export_url, history, test_habit):
+        response = authenticated_api_client.get(
+            export_url, {'output': 'csv', 'habit': test_habit.id}
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+
+        assert response['Content-Type'] == 'text/csv'
+        assert [int(row['id']) for row in rows] == [log.id for log in history[:2]]
+        assert rows[0]['completed_at'] == history[0].completed_at.isoformat()
+
+    def test_export_rejects_unknown_output(self, authenticated_api_client, export_url):
+        response = authenticated_api_client.get(export_url, {'output': 'xml'})
+
+        assert response.status_code == 400
+
+    def test_export_command_writes_all_users(self, tmp_path, history):
+        output = tmp_path / 'logs.ndjson'
+
+        call_command('export_habit_logs', str(output), chunk_size=1, stdout=StringIO())
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+
+        assert len(rows) == HabitLog.objects.count() == 4
+        assert len({row['user_id'] for row in rows}) == 2
+
+    def test_export_command_skips_soft_deleted_habits_and_users(
+        self, tmp_path, history, test_monthly_habit, other_user
+    ):
+        output = tmp_path / 'logs.ndjson'
+        Habit.all_objects.filter(pk=test_monthly_habit.pk).update(deleted_at=timezone.now())
+        get_user_model().objects.filter(pk=other_user.pk).update(deleted_at=timezone.now())
+
+        call_command('export_habit_logs', str(output), stdout=StringIO())
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+
+        assert [row['id'] for row in rows] == [log.id for log in history[:2]]
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.fixture
+    def async_request(self, test_user):
+        token = RefreshToken.for_user(test_user).access_token
+        factory = AsyncRequestFactory()
+
+        def request(view, path, method='get', headers=None, **kwargs):
+            headers = {'Authorization': f'Bearer {token}', **(headers or {})}
+            return async_to_sync(view)(getattr(factory, method)(path, headers=headers, **kwargs))
+        return request
+
+    def walk_pages(self, async_request, view, url):
+        ids = []
+        while url:
+            data = json.loads(async_request(view, url).content)
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+        return ids
+
+    def test_async_dashboard_matches_sync_dashboard(
+        self, async_request, authenticated_api_client, habit_dashboard_url,
+        test_habit_log, test_goal, habit_reminder
+    ):
+        response = async_request(async_views.habit_dashboard, habit_dashboard_url)
+        cache.clear()
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == (
+            authenticated_api_client.get(habit_dashboard_url).json()
+        )
+
+    def test_async_dashboard_returns_304_for_matching_etag(
+        self, async_request, habit_dashboard_url, test_habit
+    ):
+        etag = async_request(async_views.habit_dashboard, habit_dashboard_url)['ETag']
+
+        response = async_request(
+            async_views.habit_dashboard, habit_dashboard_url, headers={'If-None-Match': etag}
+        )
+
+        assert response.status_code == 304
+
+    def test_async_habit_list_pages_both_ways(
+        self, async_request, habit_url, test_user, other_user_habit
+    ):
+        habits = [Habit.objects.create(user=test_user, name=f'Habit {i}') for i in range(5)]
+        first_page = json.loads(
+            async_request(async_views.habit_list, habit_url, data={'page_size': 2}).content
+        )
+        second_page = json.loads(
+            async_request(async_views.habit_list, first_page['next']).content
+        )
+        back = json.loads(async_request(async_views.habit_list, second_page['previous']).content)
+
+        assert first_page['previous'] is None
+        assert [row['id'] for row in back['results']] == [
+            row['id'] for row in first_page['results']
+        ]
+        assert self.walk_pages(
+            async_request, async_views.habit_list, f'{habit_url}?page_size=2'
+        ) == [habit.id for habit in reversed(habits)]
+
+    def test_async_habit_log_list_breaks_completed_at_ties(
+        self, async_request, habit_log_url, test_user
+    ):
+        habit = Habit.objects.create(user=test_user, name='Weekly', frequency='weekly')
+        completed_at = timezone.now() - timedelta(hours=1)
+        logs = [create_log_at(habit, completed_at) for _ in range(3)]
+        logs.append(create_log_at(habit, timezone.now()))
+
+        ids = self.walk_pages(
+            async_request, async_views.habit_log_list,
+            f'{habit_log_url}?page_size=2&habit={habit.id}'
+        )
+
+        assert ids == [logs[3].id, logs[2].id, logs[1].id, logs[0].id]
+
+    def test_async_habit_log_list_validates_filters(self, async_request, habit_log_url):
+        response = async_request(
+            async_views.habit_log_list, habit_log_url, data={'completed_after': 'yesterday'}
+        )
+
+        assert response.status_code == 400
+        assert 'completed_after' in json.loads(response.content)
+
+    def test_async_views_require_authentication(self, habit_url):
+        request = AsyncRequestFactory().get(habit_url)
+
+        response = async_to_sync(async_views.habit_list)(request)
+
+        assert response.status_code == 401
+        assert response['WWW-Authenticate'].startswith('Bearer')
+
+    def test_async_views_delegate_writes_to_sync_views(self, async_request, habit_url):
+        response = async_request(
+            async_views.habit_list, habit_url, method='post',
+            data={'name': 'Read', 'frequency': 'daily'}, content_type='application/json'
+        )
+
+        assert response.status_code == 201
+        assert Habit.objects.filter(name='Read').exists()
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+class TestReplicaRouting:
+    @pytest.fixture(autouse=True)
+    def replica(self, settings):
+        settings.REPLICA_DATABASE_ALIAS = 'replica'
+
+    def get_on_replica(self, client, url):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = client.get(url)
+        return response, len(replica_queries)
+
+    def test_safe_requests_read_from_replica(
+        self, authenticated_api_client, habit_url, habit_log_url, test_habit_log
+    ):
+        _, habit_queries = self.get_on_replica(authenticated_api_client, habit_url)
+        response, log_queries = self.get_on_replica(authenticated_api_client, habit_log_url)
+
+        assert habit_queries > 0
+        assert log_queries > 0
+        assert response.data['results'][0]['id'] == test_habit_log.id
+
+    def test_reads_stick_to_primary_after_write(
+        self, authenticated_api_client, habit_log_url, habit_dashboard_url, test_habit
+    ):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            authenticated_api_client.post(habit_log_url, {'habit': test_habit.id})
+        response, dashboard_queries = self.get_on_replica(
+            authenticated_api_client, habit_dashboard_url
+        )
+
+        assert len(replica_queries) == 0
+        assert dashboard_queries == 0
+        assert response.data[0]['today_log'] is not None
+
+    def test_reads_return_to_replica_after_sticky_window(
+        self, authenticated_api_client, habit_url, test_habit
+    ):
+        authenticated_api_client.patch(
+            reverse('habits:habit-detail', args=[test_habit.id]), {'name': 'Renamed'}
+        )
+        cache.delete(f'db:recent-write:{test_habit.user_id}')
+
+        _, replica_queries = self.get_on_replica(authenticated_api_client, habit_url)
+
+        assert replica_queries > 0
+
+    def test_failed_write_does_not_stick_to_primary(
+        self, authenticated_api_client, habit_url, habit_log_url, other_user_habit
+    ):
+        authenticated_api_client.post(habit_log_url, {'habit': other_user_habit.id})
+
+        _, replica_queries = self.get_on_replica(authenticated_api_client, habit_url)
+
+        assert replica_queries > 0
+
+    def test_replica_is_not_used_without_alias(self, settings, authenticated_api_client, habit_url):
+        settings.REPLICA_DATABASE_ALIAS = None
+
+        _, replica_queries = self.get_on_replica(authenticated_api_client, habit_url)
+
+        assert replica_queries == 0
+
+
+@pytest.mark.django_db
+class TestHabitLogPartitions:
+    def months_from_now(self, months):
+        today = timezone.localdate()
+        year, month = divmod(today.year * 12 + today.month - 1 + months, 12)
+        return timezone.make_aware(datetime(year, month + 1, 15, 12))
+
+    def partition_suffix(self, months):
+        return self.months_from_now(months).strftime('_p%Y%m')
+
+    def partition_of(self, log):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM habits_habitlog WHERE id = %s', [log.id]
+            )
+            return cursor.fetchone()[0]
+
+    def manage_partitions(self, **options):
+        call_command('manage_habit_log_partitions', stdout=StringIO(), **options)
+
+    def test_convert_partitions_existing_logs_by_month(self, test_habit, test_habit_log):
+        old_log = create_log_at(test_habit, self.months_from_now(-2))
+
+        self.manage_partitions(convert=True, months_ahead=2)
+
+        assert partitions.is_partitioned()
+        assert len(partitions.list_partitions()) == 5
+        assert self.partition_of(old_log).endswith(self.partition_suffix(-2))
+        assert self.partition_of(test_habit_log).endswith(self.partition_suffix(0))
+        assert HabitLog.objects.count() == 2
+
+    def test_partitioned_logs_keep_ids_and_one_log_per_period(
+        self, authenticated_api_client, habit_log_url, test_habit, test_habit_log
+    ):
+        self.manage_partitions(convert=True, months_ahead=1)
+
+        duplicate = authenticated_api_client.post(habit_log_url, {'habit': test_habit.id})
+        weekly_habit = Habit.objects.create(user=test_habit.user, name='Weekly', frequency='weekly')
+        created = authenticated_api_client.post(habit_log_url, {'habit': weekly_habit.id})
+
+        assert duplicate.status_code == 400
+        assert duplicate.data['habit'] == ['You can only log daily habit once per day.']
+        assert created.status_code == 201
+        assert created.data['id'] > test_habit_log.id
+
+    def local_month_start(self, tz, months, hour):
+        today = timezone.localdate(timezone.now(), tz)
+        year, month = divmod(today.year * 12 + today.month - 1 + months, 12)
+        return datetime(year, month + 1, 1, hour, tzinfo=tz)
+
+    def test_one_log_per_period_across_partitions_for_non_utc_user(
+        self, settings, authenticated_api_client, habit_log_url, test_user, test_habit,
+        test_monthly_habit
+    ):
+        settings.HABIT_LOG_PARTITIONING = True
+        test_user.timezone = 'Europe/Kyiv'
+        test_user.save()
+        kyiv = ZoneInfo('Europe/Kyiv')
+        # Just after local midnight of the 1st is still the previous month in UTC.
+        create_log_at(test_habit, self.local_month_start(kyiv, -1, 0).replace(minute=30))
+        create_log_at(test_monthly_habit, self.local_month_start(kyiv, 0, 0))
+        self.manage_partitions(convert=True, months_ahead=1)
+
+        synced = authenticated_api_client.post(
+            reverse('habits:habit-log-bulk-sync'),
+            [{'habit': test_habit.id, 'completed_at': self.local_month_start(kyiv, -1, 12)}],
+            format='json',
+        )
+        posted = authenticated_api_client.post(habit_log_url, {'habit': test_monthly_habit.id})
+
+        assert synced.data['results'][0]['status'] == 'duplicate'
+        assert posted.status_code == 400
+        assert posted.data['habit'] == ['You can only log monthly habit once per month.']
+        assert HabitLog.objects.filter(habit__user=test_user).count() == 2
+
+    def test_new_partition_takes_over_rows_from_default_partition(self, test_habit):
+        self.manage_partitions(convert=True, months_ahead=0)
+        future_log = create_log_at(test_habit, self.months_from_now(2))
+
+        assert self.partition_of(future_log) == partitions.DEFAULT_PARTITION
+
+        self.manage_partitions(months_ahead=2)
+
+        assert self.partition_of(future_log).endswith(self.partition_suffix(2))
+
+    def test_expired_partitions_are_dropped(self, test_habit, test_habit_log):
+        expired_log = create_log_at(test_habit, self.months_from_now(-14))
+        self.manage_partitions(convert=True, months_ahead=0)
+
+        self.manage_partitions(months_ahead=0, retention_months=12, drop=True)
+
+        assert not HabitLog.objects.filter(id=expired_log.id).exists()
+        assert HabitLog.objects.filter(id=test_habit_log.id).exists()
+        assert len(partitions.list_partitions()) == 13
+
+    def test_dashboard_logs_are_read_from_one_partition(
+        self, authenticated_api_client, habit_dashboard_url, test_habit, test_habit_log
+    ):
+        create_log_at(test_habit, self.months_from_now(-1))
+        self.manage_partitions(convert=True, months_ahead=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_api_client.get(habit_dashboard_url)
+        log_query = next(query['sql'] for query in queries if 'habits_habitlog' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {log_query}')
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+
+        assert plan.count('habits_habitlog_') == plan.count(self.partition_suffix(0)) >= 1
+
+    def test_partitions_are_not_managed_before_conversion(self, settings):
+        settings.HABIT_LOG_PARTITIONING = True
+
+        with pytest.raises(CommandError):
+            self.manage_partitions()
+        assert tasks.manage_habit_log_partitions() == "Habit log partitioning is disabled"
+
+
+@pytest.mark.django_db
+class TestBackgroundDeletion:
+    @pytest.fixture
+    def heavy_habit(self, test_habit, habit_reminder, test_goal):
+        for days_ago in range(25):
+            create_log_at(test_habit, timezone.now() - timedelta(days=days_ago))
+        return test_habit
+
+    def test_api_delete_hides_habit_and_purges_in_background(
+        self, authenticated_api_client, heavy_habit, goal_url, eager_celery,
+        django_capture_on_commit_callbacks
+    ):
+        url = reverse('habits:habit-detail', args=[heavy_habit.id])
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = authenticated_api_client.delete(url)
+
+        assert response.status_code == 204
+        assert Habit.all_objects.get(id=heavy_habit.id).deleted_at is not None
+        assert authenticated_api_client.get(goal_url).data['results'] == []
+
+        for callback in callbacks:
+            callback()
+
+        assert not Habit.all_objects.filter(id=heavy_habit.id).exists()
+        for model in (HabitLog, HabitPeriodStat, Goal, Reminder):
+            assert not model.objects.filter(habit_id=heavy_habit.id).exists()
+
+    def test_purge_runs_in_bounded_batches_and_resumes(
+        self, settings, monkeypatch, heavy_habit
+    ):
+        settings.HABIT_PURGE_BATCH_SIZE = 10
+        settings.HABIT_PURGE_MAX_BATCHES = 2
+        Habit.all_objects.filter(pk=heavy_habit.pk).update(deleted_at=timezone.now())
+        requeued = []
+        monkeypatch.setattr(tasks.purge_habit, 'delay', requeued.append)
+
+        result = tasks.purge_habit.run(heavy_habit.id)
+
+        assert result == f"Deleted 20 rows of habit {heavy_habit.id}, continuing"
+        assert requeued == [heavy_habit.id]
+        assert HabitLog.objects.filter(habit_id=heavy_habit.id).count() == 5
+
+        settings.HABIT_PURGE_MAX_BATCHES = 10
+        result = tasks.purge_habit.run(heavy_habit.id)
+
+        assert result == f"Purged habit {heavy_habit.id} (33 rows)"
+        assert not Habit.all_objects.filter(id=heavy_habit.id).exists()
+
+    def test_purge_keeps_habit_that_was_not_deleted(self, heavy_habit):
+        result = tasks.purge_habit.run(heavy_habit.id)
+
+        assert result == f"Habit {heavy_habit.id} is not waiting to be purged"
+        assert Habit.objects.filter(id=heavy_habit.id).exists()
+        for model in (HabitLog, HabitPeriodStat, Goal, Reminder):
+            assert model.objects.filter(habit_id=heavy_habit.id).exists()
+
+    def test_soft_deleted_user_is_purged(
+        self, test_user, heavy_habit, eager_celery, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            deletion.soft_delete_user(test_user)
+
+        assert not get_user_model().objects.get(pk=test_user.pk).is_active
+        assert not Habit.objects.filter(user=test_user).exists()
+
+        for callback in callbacks:
+            callback()
+
+        assert not get_user_model().objects.filter(pk=test_user.pk).exists()
+        assert not Habit.all_objects.filter(user_id=test_user.pk).exists()
+        assert not HabitLog.objects.filter(habit_id=heavy_habit.id).exists()
+
+    def test_user_admin_soft_deletes_accounts(
+        self, monkeypatch, test_user, test_habit, django_capture_on_commit_callbacks
+    ):
+        user_admin = admin.site._registry[get_user_model()]
+        queued = []
+        monkeypatch.setattr(tasks.purge_user, 'delay', queued.append)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user_admin.delete_model(None, test_user)
+
+        assert get_user_model().objects.get(pk=test_user.pk).deleted_at is not None
+        assert not Habit.objects.filter(user=test_user).exists()
+        assert queued == [test_user.pk]
+
+    def test_resume_purges_queues_stale_deletions(
+        self, settings, monkeypatch, test_habit, other_user_habit
+    ):
+        settings.HABIT_PURGE_RESUME_AFTER = 60
+        Habit.all_objects.filter(pk=test_habit.pk).update(
+            deleted_at=timezone.now() - timedelta(hours=2)
+        )
+        Habit.all_objects.filter(pk=other_user_habit.pk).update(deleted_at=timezone.now())
+
+        queued = []
+        monkeypatch.setattr(tasks.purge_habit, 'delay', queued.append)
+        result = tasks.resume_purges()
+
+        assert queued == [test_habit.id]
+        assert result == "Resumed purges of 0 users and 1 habits"
+
+
+class StubSendGridClient:
+    """Records sent messages instead of calling SendGrid; fails sends while `failing` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.failing = False
+
+    def send(self, message):
+        if self.failing:
+            raise ConnectionError('SendGrid is unavailable')
+        self.sent.append(message.get())
+        return SimpleNamespace(status_code=202)
+
+
+@pytest.mark.django_db
+class TestReminderBatches:
+    @pytest.fixture
+    def sg_client(self, monkeypatch):
+        client = StubSendGridClient()
+        monkeypatch.setattr(tasks, 'sg_client', client)
+        return client
+
+    @pytest.fixture
+    def due_reminders(self, monkeypatch, test_user, other_user):
+        now = timezone.make_aware(datetime(2025, 3, 1, 8, 0, 30))
+        monkeypatch.setattr(tasks, 'timezone', SimpleNamespace(now=lambda: now))
+        reminders = []
+        for user, name in [
+            (test_user, 'Read'), (test_user, 'Run'), (other_user, 'Write'), (other_user, '<Swim>')
+        ]:
+            habit = Habit.objects.create(user=user, name=name, frequency='daily')
+            reminders.append(Reminder.objects.create(habit=habit, reminder_time='08:00:00'))
+        not_due = Habit.objects.create(user=test_user, name='Later', frequency='daily')
+        Reminder.objects.create(habit=not_due, reminder_time='08:01:00')
+        return reminders
+
+    def test_due_reminders_are_sent_in_batches(
+        self, settings, eager_celery, sg_client, due_reminders
+    ):
+        settings.REMINDER_BATCH_SIZE = 3
+
+        assert tasks.send_daily_reminders() == "Queued 4 reminder emails"
+
+        assert [len(message['personalizations']) for message in sg_client.sent] == [3, 1]
+        personalizations = {
+            p['subject']: p for message in sg_client.sent for p in message['personalizations']
+        }
+        assert set(personalizations) == {
+            f"Reminder: Time for your habit - {name}" for name in ['Read', 'Run', 'Write', '<Swim>']
+        }
+        swim = personalizations["Reminder: Time for your habit - <Swim>"]
+        assert swim['to'] == [{'email': 'other_user@example.com'}]
+        assert '<strong>&lt;Swim&gt;</strong>' in swim['substitutions']['-reminder-']
+        assert '-reminder-' in sg_client.sent[0]['content'][0]['value']
+
+    def test_digest_users_get_one_email_for_all_due_habits(
+        self, eager_celery, sg_client, test_user, due_reminders
+    ):
+        test_user.reminder_digest = True
+        test_user.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            assert tasks.send_daily_reminders() == "Queued 3 reminder emails"
+
+        digest, = [
+            p for message in sg_client.sent for p in message['personalizations']
+            if p['to'] == [{'email': test_user.email}]
+        ]
+        assert digest['subject'] == "Reminder: Time for your habits - Read, Run"
+        assert '<li><strong>Read</strong></li><li><strong>Run</strong></li>' in (
+            digest['substitutions']['-reminder-']
+        )
+        assert len([query for query in queries if 'ARRAY_AGG' in query['sql']]) == 1
+
+    def test_failed_batch_falls_back_to_individual_emails(self, monkeypatch, sg_client):
+        retried = []
+        monkeypatch.setattr(
+            tasks.send_reminder_email, 'delay', lambda **recipient: retried.append(recipient)
+        )
+        sg_client.failing = True
+        recipients = [
+            {'user_email': 'a@example.com', 'habit_names': ['Read']},
+            {'user_email': 'b@example.com', 'habit_names': ['Read', 'Run']},
+        ]
+
+        result = tasks.send_reminder_batch(recipients)
+
+        assert result == "Batch of 2 reminders failed, queued them one by one"
+        assert retried == recipients
+
+    def test_digest_email_lists_every_habit(self, sg_client):
+        tasks.send_reminder_email('a@example.com', ['Read', 'Run'])
+
+        message = sg_client.sent[0]
+        assert message['subject'] == "Reminder: Time for your habits - Read, Run"
+        assert '<li><strong>Run</strong></li>' in message['content'][0]['value']
+
+
+@pytest.mark.django_db
+class TestUserTimezones:
+    @pytest.fixture
+    def tokyo_user(self, test_user):
+        test_user.timezone = 'Asia/Tokyo'
+        test_user.save()
+        return test_user
+
+    def test_reminder_stores_utc_minute_of_day(self, tokyo_user, test_habit):
+        reminder = Reminder.objects.create(habit=test_habit, reminder_time='08:30:00')
+
+        assert reminder.utc_minute_of_day == 23 * 60 + 30
+
+    def test_log_and_reminder_writes_do_not_reload_owner(
+        self, authenticated_api_client, habit_log_url, reminder_url, test_habit
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_api_client.post(habit_log_url, {'habit': test_habit.id})
+            created = authenticated_api_client.post(
+                reminder_url, {'habit': test_habit.id, 'reminder_time': '08:30:00'}
+            )
+            updated = authenticated_api_client.patch(
+                f"{reminder_url}{created.data['id']}/", {'reminder_time': '09:00:00'}
+            )
+
+        assert updated.status_code == 200
+        assert not [query for query in queries if 'FROM "users_customuser"' in query['sql']]
+
+    def test_timezone_change_moves_reminders(self, test_user, habit_reminder):
+        assert habit_reminder.utc_minute_of_day == 8 * 60
+
+        test_user.timezone = 'Asia/Kolkata'
+        test_user.save()
+        habit_reminder.refresh_from_db()
+
+        assert habit_reminder.utc_minute_of_day == 2 * 60 + 30
+
+    def test_sync_task_recomputes_stale_utc_minutes(self, habit_reminder, other_user_habit):
+        Reminder.objects.create(habit=other_user_habit, reminder_time='09:00:00')
+        Reminder.objects.filter(pk=habit_reminder.pk).update(utc_minute_of_day=7 * 60)
+
+        assert tasks.sync_reminder_utc_minutes() == "Moved 1 reminders to a new UTC minute"
+        habit_reminder.refresh_from_db()
+        assert habit_reminder.utc_minute_of_day == 8 * 60
+
+    def test_reminder_is_sent_at_local_time(
+        self, monkeypatch, eager_celery, tokyo_user, test_habit
+    ):
+        Reminder.objects.create(habit=test_habit, reminder_time='17:00:00')
+        sent = []
+        monkeypatch.setattr(tasks.send_reminder_batch, 'delay', sent.append)
+        now = timezone.make_aware(datetime(2025, 3, 1, 8, 0, 30))
+        monkeypatch.setattr(tasks, 'timezone', SimpleNamespace(now=lambda: now))
+
+        assert tasks.send_daily_reminders() == "Queued 1 reminder emails"
+        assert sent == [[{'user_email': tokyo_user.email, 'habit_names': [test_habit.name]}]]
+
+    def tokyo_today(self):
+        return timezone.localdate(timezone.now(), ZoneInfo('Asia/Tokyo'))
+
+    def log_at_tokyo_time(self, habit, day, hour):
+        return create_log_at(
+            habit, datetime.combine(day, time(hour), tzinfo=ZoneInfo('Asia/Tokyo'))
+        )
+
+    def test_rebuilt_period_stats_use_local_days(self, tokyo_user, test_habit):
+        # 05:00 in Tokyo is still the previous day in UTC
+        self.log_at_tokyo_time(test_habit, date(2026, 3, 2), 5)
+
+        call_command('rebuild_period_stats', stdout=StringIO())
+
+        assert list(HabitPeriodStat.objects.values_list('period', 'completions')) == [
+            (date(2026, 3, 2), 1)
+        ]
+
+    def test_backfill_last_completed_uses_local_day(self, tokyo_user, test_habit):
+        self.log_at_tokyo_time(test_habit, date(2026, 3, 2), 5)
+        Habit.objects.filter(pk=test_habit.pk).update(last_period_key=None)
+
+        call_command('backfill_last_completed', stdout=StringIO())
+        test_habit.refresh_from_db()
+
+        assert test_habit.last_period_key == date(2026, 3, 2).toordinal()
+
+    def test_streaks_count_up_to_the_local_today(self, tokyo_user, test_habit, other_user):
+        today = self.tokyo_today()
+        for days_ago in range(2):
+            self.log_at_tokyo_time(test_habit, today - timedelta(days=days_ago), 5)
+        utc_habit = Habit.objects.create(user=other_user, name='UTC habit')
+        create_log_at(utc_habit, timezone.now())
+
+        streaks = compute_streaks([test_habit.id, utc_habit.id])
+
+        assert streaks[test_habit.id] == (tokyo_user.id, 2, 2)
+        assert streaks[utc_habit.id] == (other_user.id, 1, 1)
+
+    def test_logs_fall_in_the_users_local_day(
+        self, authenticated_api_client, habit_log_url, tokyo_user, test_habit
+    ):
+        response = authenticated_api_client.post(habit_log_url, {'habit': test_habit.id})
+        late_log = create_log_at(
+            test_habit,
+            datetime.combine(date(2025, 3, 1), time(23, 30), tzinfo=ZoneInfo('UTC'))
+        )
+
+        log = HabitLog.objects.get(pk=response.data['id'])
+        assert log.period_key == timezone.localdate(timezone.now(), tokyo_user.timezone).toordinal()
+        assert late_log.period_key == date(2025, 3, 2).toordinal()
+
+
+@pytest.mark.django_db
+class TestReminderDispatch:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = SimpleNamespace(now=timezone.make_aware(datetime(2025, 3, 1, 8, 0, 30)))
+        monkeypatch.setattr(tasks, 'timezone', SimpleNamespace(now=lambda: clock.now))
+        return clock
+
+    @pytest.fixture
+    def queued(self, monkeypatch):
+        queued = []
+        monkeypatch.setattr(tasks.send_reminder_batch, 'delay', queued.extend)
+        return queued
+
+    def create_reminder(self, user, name, reminder_time):
+        habit = Habit.objects.create(user=user, name=name, frequency='daily')
+        return Reminder.objects.create(habit=habit, reminder_time=reminder_time)
+
+    def set_watermark(self, processed_until):
+        TaskWatermark.objects.create(
+            name=tasks.REMINDER_WATERMARK, processed_until=timezone.make_aware(processed_until)
+        )
+
+    def queued_habits(self, queued):
+        return sorted(name for recipient in queued for name in recipient['habit_names'])
+
+    def test_catches_up_on_missed_minutes(self, clock, queued, test_user):
+        self.set_watermark(datetime(2025, 3, 1, 7, 56))
+        for name, reminder_time in [('Early', '07:56'), ('Missed', '07:58'), ('Now', '08:00')]:
+            self.create_reminder(test_user, name, reminder_time)
+
+        assert tasks.send_daily_reminders() == "Queued 2 reminder emails"
+        assert self.queued_habits(queued) == ['Missed', 'Now']
+        assert TaskWatermark.objects.get().processed_until == timezone.make_aware(
+            datetime(2025, 3, 1, 8, 0)
+        )
+
+    def test_repeated_run_does_not_send_twice(self, clock, queued, test_user):
+        self.create_reminder(test_user, 'Read', '08:00')
+
+        tasks.send_daily_reminders()
+        TaskWatermark.objects.all().delete()
+
+        assert tasks.send_daily_reminders() == "Queued 0 reminder emails"
+        assert self.queued_habits(queued) == ['Read']
+        assert ReminderDispatch.objects.get().date == date(2025, 3, 1)
+
+    def test_catch_up_spans_midnight(self, clock, queued, test_user):
+        clock.now = timezone.make_aware(datetime(2025, 3, 2, 0, 1))
+        self.set_watermark(datetime(2025, 3, 1, 23, 58))
+        late = self.create_reminder(test_user, 'Late', '23:59')
+        early = self.create_reminder(test_user, 'Early', '00:00')
+
+        assert tasks.send_daily_reminders() == "Queued 2 reminder emails"
+        assert dict(ReminderDispatch.objects.values_list('reminder', 'date')) == {
+            late.pk: date(2025, 3, 1), early.pk: date(2025, 3, 2)
+        }
+
+    def test_dispatch_follows_local_date_across_dst(self, clock, queued, test_user):
+        test_user.timezone = 'America/New_York'
+        test_user.save()
+        reminder = self.create_reminder(test_user, 'Evening walk', '19:30')
+        # Saturday 2025-03-08 19:30 EST is Sunday 00:30 UTC
+        Reminder.objects.filter(pk=reminder.pk).update(utc_minute_of_day=30)
+        clock.now = timezone.make_aware(datetime(2025, 3, 9, 0, 30))
+        tasks.send_daily_reminders()
+
+        # After spring-forward, Sunday 19:30 EDT is 23:30 UTC on the same UTC date
+        Reminder.objects.filter(pk=reminder.pk).update(utc_minute_of_day=23 * 60 + 30)
+        clock.now = timezone.make_aware(datetime(2025, 3, 9, 23, 30))
+        tasks.send_daily_reminders()
+
+        assert self.queued_habits(queued) == ['Evening walk', 'Evening walk']
+        assert sorted(ReminderDispatch.objects.values_list('date', flat=True)) == [
+            date(2025, 3, 8), date(2025, 3, 9)
+        ]
+
+    def test_failed_publish_releases_the_claim(self, monkeypatch, clock, test_user):
+        self.set_watermark(datetime(2025, 3, 1, 7, 59))
+        self.create_reminder(test_user, 'Read', '08:00')
+
+        def broker_down(recipients):
+            raise ConnectionError('broker unavailable')
+
+        monkeypatch.setattr(tasks.send_reminder_batch, 'delay', broker_down)
+        with pytest.raises(ConnectionError):
+            tasks.send_daily_reminders()
+
+        assert not ReminderDispatch.objects.exists()
+        assert TaskWatermark.objects.get().processed_until == timezone.make_aware(
+            datetime(2025, 3, 1, 7, 59)
+        )
+
+        queued = []
+        monkeypatch.setattr(tasks.send_reminder_batch, 'delay', queued.extend)
+        clock.now += timedelta(minutes=1)
+
+        assert tasks.send_daily_reminders() == "Queued 1 reminder emails"
+        assert self.queued_habits(queued) == ['Read']
+
+    def test_catch_up_is_limited(self, settings, clock, queued, test_user):
+        settings.REMINDER_MAX_CATCH_UP_MINUTES = 5
+        self.set_watermark(datetime(2025, 3, 1, 6, 0))
+        self.create_reminder(test_user, 'Stale', '07:00')
+        self.create_reminder(test_user, 'Recent', '07:56')
+
+        tasks.send_daily_reminders()
+
+        assert self.queued_habits(queued) == ['Recent']
+
+    def test_prune_old_dispatches(self, clock, habit_reminder):
+        ReminderDispatch.objects.create(reminder=habit_reminder, date=date(2025, 2, 1))
+        recent = ReminderDispatch.objects.create(reminder=habit_reminder, date=date(2025, 2, 28))
+
+        assert tasks.prune_reminder_dispatches() == "Deleted 1 reminder dispatches"
+        assert list(ReminderDispatch.objects.all()) == [recent]
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import HabitViewSet, GoalViewSet, HabitLogListCreateView, ReminderViewSet
+from . import async_views
+from .views import (
+    HabitViewSet, GoalViewSet, HabitLogListCreateView, HabitLogBulkSyncView, HabitLogExportView,
+    ReminderViewSet
+)
 
 router = DefaultRouter()
 router.register(r'habits', HabitViewSet, basename='habit')
@@ -12,4 +17,13 @@ app_name = 'habits'
 urlpatterns = [
     path('', include(router.urls)),
     path('habit-logs/', HabitLogListCreateView.as_view(), name='habit-log-list-create'),
+    path('habit-logs/bulk/', HabitLogBulkSyncView.as_view(), name='habit-log-bulk-sync'),
+    path('habit-logs/export/', HabitLogExportView.as_view(), name='habit-log-export'),
 ]
+
+if settings.HABITS_ASYNC_VIEWS:
+    urlpatterns = [
+        path('habits/', async_views.habit_list, name='habit-list'),
+        path('habits/dashboard/', async_views.habit_dashboard, name='habit-dashboard'),
+        path('habit-logs/', async_views.habit_log_list, name='habit-log-list-create'),
+    ] + urlpatterns
@@ -1,20 +1,81 @@
-from rest_framework import viewsets, generics
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
+from habit_tracker.routers import (
+    has_recent_write, mark_recent_write, start_replica_reads, stop_replica_reads
+)
+from .cache import get_dashboard_cache_key
+from .deletion import soft_delete_habit
+from .export import EXPORT_CONTENT_TYPES, export_habit_logs
+from .heatmap import build_year_heatmap, expand_heatmap
+from .periods import count_periods
+from .streaks import recompute_streaks
+from .sync import sync_habit_logs
 from .models import Habit, Goal, HabitLog, Reminder
 from .serializers import (
     HabitSerializer, GoalSerializer,
-    HabitLogSerializer, HabitDashboardSerializer,
-    ReminderSerializer
+    HabitLogSerializer, HabitLogFilterSerializer, HabitLogExportQuerySerializer,
+    HabitLogSyncItemSerializer,
+    HabitDashboardSerializer,
+    HabitStatsQuerySerializer, HabitCalendarQuerySerializer, ReminderSerializer
 )
 
 
-class HabitViewSet(viewsets.ModelViewSet):
+class ReplicaReadMixin:
+    """
+    Serve safe requests from the read replica unless the user wrote within the last
+    REPLICA_STICKY_SECONDS, and start that window after every successful write.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not has_recent_write(request.user.id):
+            self.replica_reads_token = start_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'replica_reads_token', None)
+        if token is not None:
+            self.replica_reads_token = None
+            stop_replica_reads(token)
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and (
+            request.user.is_authenticated
+        ):
+            mark_recent_write(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class UserTimezoneMixin:
+    """
+    Handle authenticated requests in the user's timezone, so today's date and the days
+    and months habit logs fall in are the user's local ones.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            timezone.activate(request.user.timezone)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timezone.deactivate()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class HabitViewSet(UserTimezoneMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing habits.
 
     Provides CRUD operations for habits and includes a dashboard endpoint.
     Only displays and allows operations on habits owned by the current user.
+    Deleted habits are hidden at once and purged in the background.
     """
     serializer_class = HabitSerializer
 
@@ -24,6 +85,9 @@ class HabitViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete_habit(instance)
+
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """
@@ -33,13 +97,99 @@ class HabitViewSet(viewsets.ModelViewSet):
         - Basic habit information
         - Current in-progress goal (if exists)
         - Today's log for daily habits or this month's log for monthly habits
+
+        Responses are cached per user until one of their habits, goals, logs or
+        reminders changes or the day rolls over, and carry an ETag so unchanged
+        dashboards are answered with 304 Not Modified.
         """
-        habits = self.get_queryset()
-        serializer = HabitDashboardSerializer(habits, many=True)
-        return Response(serializer.data)
+        cache_key, etag = get_dashboard_cache_key(request.user.id)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = cache.get(cache_key)
 
+        if data is None:
+            habits = self.get_queryset().with_dashboard_data()
+            data = HabitDashboardSerializer(habits, many=True).data
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+
+        return Response(data, headers={'ETag': etag})
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Return completion statistics of a habit read from the daily HabitPeriodStat rollup:
+        - Total completions and completions this month
+        - Completions and completion rate over the last `days` days (30 by default)
+        """
+        habit = self.get_object()
+        query = HabitStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        today = timezone.localdate()
+        window_start = max(
+            today - timedelta(days=query.validated_data['days'] - 1),
+            timezone.localdate(habit.created_at),
+        )
+        totals = habit.period_stats.aggregate(
+            total=Coalesce(Sum('completions'), 0),
+            this_month=Coalesce(Sum('completions', filter=Q(period__gte=today.replace(day=1))), 0),
+            window=Coalesce(Sum('completions', filter=Q(period__gte=window_start)), 0),
+        )
+        expected = count_periods(habit.frequency, window_start, today)
+
+        return Response({
+            'habit': habit.id,
+            'frequency': habit.frequency,
+            'total_completions': totals['total'],
+            'this_month_completions': totals['this_month'],
+            'window': {
+                'days': query.validated_data['days'],
+                'start': window_start,
+                'completions': totals['window'],
+                'expected': expected,
+                'completion_rate': round(min(totals['window'] / expected, 1), 4),
+            },
+        })
+
+    @action(detail=True, methods=['get'])
+    def calendar(self, request, pk=None):
+        """
+        Return a yearly heatmap of the habit as a base64 bitset with one bit per day
+        (one per month for monthly habits). Pass `expand=true` to also get the list
+        of completed days or months.
+        """
+        habit = self.get_object()
+        query = HabitCalendarQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
 
-class GoalViewSet(viewsets.ModelViewSet):
+        year = query.validated_data.get('year') or timezone.localdate().year
+        data = {'habit': habit.id, **build_year_heatmap(habit, year)}
+
+        if query.validated_data['expand']:
+            data['completed'] = expand_heatmap(data)
+
+        return Response(data)
+
+    @action(detail=True, methods=['post'], url_path='recompute-streak')
+    def recompute_streak(self, request, pk=None):
+        """
+        Rebuild the habit's current and longest streak from its logs and store them
+        on the habit and its in-progress goal.
+        """
+        habit = self.get_object()
+        _, current_streak, longest_streak = recompute_streaks([habit.id])[habit.id]
+
+        return Response({
+            'habit': habit.id,
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+        })
+
+
+class GoalViewSet(UserTimezoneMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing habit goals.
 
@@ -50,10 +200,10 @@ class GoalViewSet(viewsets.ModelViewSet):
     serializer_class = GoalSerializer
 
     def get_queryset(self):
-        return Goal.objects.filter(habit__user=self.request.user)
+        return Goal.objects.filter(habit__user=self.request.user, habit__deleted_at__isnull=True)
 
 
-class HabitLogListCreateView(generics.ListCreateAPIView):
+class HabitLogListCreateView(UserTimezoneMixin, ReplicaReadMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating habit logs.
 
@@ -61,14 +211,88 @@ class HabitLogListCreateView(generics.ListCreateAPIView):
     - Users can only log their own habits
     - Daily habits can only be logged once per day
     - Monthly habits can only be logged once per month
+
+    Logs are paginated with a cursor over (completed_at, id), newest first, and can be
+    filtered with the `habit`, `completed_after`, `completed_before` and `frequency`
+    query parameters.
     """
     serializer_class = HabitLogSerializer
+    pagination_ordering = ('-completed_at', '-id')
 
     def get_queryset(self):
-        return HabitLog.objects.filter(habit__user=self.request.user)
+        filters = HabitLogFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return HabitLog.objects.filter(
+            user=self.request.user, habit__deleted_at__isnull=True
+        ).filter_history(**filters.validated_data)
+
+
+class HabitLogBulkSyncView(UserTimezoneMixin, ReplicaReadMixin, generics.GenericAPIView):
+    """
+    API endpoint for replaying habit logs queued by offline clients.
+
+    Accepts a list of up to HABIT_LOG_SYNC_MAX_ITEMS `{habit, completed_at}` entries and
+    returns one result per entry: `created` with the log id, `duplicate` when the period
+    is already logged, or `invalid` with the validation errors. The same business rules
+    as for single logs apply, checked for the whole batch at once.
+    """
+    serializer_class = HabitLogSyncItemSerializer
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': 'Expected a list of habit logs.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > settings.HABIT_LOG_SYNC_MAX_ITEMS:
+            return Response(
+                {'detail': f'At most {settings.HABIT_LOG_SYNC_MAX_ITEMS} habit logs per request.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(request.data)
+        valid_entries = []
+        for index, item in enumerate(request.data):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid_entries.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+        synced = sync_habit_logs(request.user, [entry for _, entry in valid_entries])
+        for (index, _), result in zip(valid_entries, synced):
+            results[index] = {**result, 'index': index}
+
+        return Response({'results': results})
+
+
+class HabitLogExportView(UserTimezoneMixin, generics.GenericAPIView):
+    """
+    API endpoint for exporting the user's full habit history.
+
+    Streams every habit log joined with its habit name, oldest first, as NDJSON
+    (default) or CSV with `output=csv`. Rows are read from the database in chunks
+    and written out as they arrive, so the response is never built in memory. The
+    same filters as the habit log list are supported.
+    """
+
+    def get(self, request, *args, **kwargs):
+        query = HabitLogExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = dict(query.validated_data)
+        output = filters.pop('output')
+
+        logs = HabitLog.objects.filter(
+            user=request.user, habit__deleted_at__isnull=True
+        ).filter_history(**filters)
+        filename = f'habit-logs-{timezone.localdate().isoformat()}.{output}'
+        response = StreamingHttpResponse(
+            export_habit_logs(logs, output), content_type=EXPORT_CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 
-class ReminderViewSet(viewsets.ModelViewSet):
+class ReminderViewSet(UserTimezoneMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing reminders.
 
@@ -79,4 +303,7 @@ class ReminderViewSet(viewsets.ModelViewSet):
     serializer_class = ReminderSerializer
 
     def get_queryset(self):
-        return Reminder.objects.filter(habit__user=self.request.user)
+        # Saving a reminder reads its owner's timezone.
+        return Reminder.objects.filter(
+            habit__user=self.request.user, habit__deleted_at__isnull=True
+        ).select_related('habit__user')
@@ -14,6 +14,7 @@ class CustomUserAdmin(UserAdmin):
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         ("Permissions", {"fields": ("is_staff", "is_active", "groups", "user_permissions")}),
+        ("Preferences", {"fields": ("timezone", "reminder_digest")}),
     )
     add_fieldsets = (
         (None, {
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# The only user fields kept in the shared cache: what authentication and the views read.
+# Other fields, the password hash included, are deferred on cached users.
+CACHED_USER_FIELDS = ('id', 'email', 'is_active', 'timezone', 'reminder_digest')
+
+
+def get_auth_user_cache_key(user_id):
+    return f'users:auth-user:{user_id}'
+
+
+def invalidate_auth_user(user_id):
+    cache.delete(get_auth_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the token's user from the cache for
+    AUTH_USER_CACHE_TIMEOUT seconds instead of querying the database on every request.
+
+    Only CACHED_USER_FIELDS are cached, and users are rebuilt from them with the other
+    fields deferred, so saving one writes back only those fields. Cached users are dropped
+    whenever the user is saved or deleted. The active check runs on every request; the
+    revoked-token check runs when the user is loaded, since a password change drops the
+    cached user.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+    def check_cached_user(self, user):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    def to_cached_fields(self, user):
+        return {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+
+    def from_cached_fields(self, fields):
+        field_names = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in fields
+        ]
+        return self.user_model.from_db(
+            self.user_model.objects.db, field_names, [fields[name] for name in field_names]
+        )
+
+    def get_user(self, validated_token):
+        cache_key = get_auth_user_cache_key(self.get_user_id(validated_token))
+        fields = cache.get(cache_key)
+
+        if fields is None:
+            user = super().get_user(validated_token)
+            cache.set(cache_key, self.to_cached_fields(user), settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        user = self.from_cached_fields(fields)
+        self.check_cached_user(user)
+        return user
+
+    async def aget_user(self, validated_token):
+        """Async version of get_user() for the async views."""
+        user_id = self.get_user_id(validated_token)
+        cache_key = get_auth_user_cache_key(user_id)
+        fields = await cache.aget(cache_key)
+
+        if fields is None:
+            user = await self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).afirst()
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            await cache.aset(
+                cache_key, self.to_cached_fields(user), settings.AUTH_USER_CACHE_TIMEOUT
+            )
+            return user
+
+        user = self.from_cached_fields(fields)
+        self.check_cached_user(user)
+        return user
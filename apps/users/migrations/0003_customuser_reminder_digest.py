@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_customuser_deleted_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="reminder_digest",
+            field=models.BooleanField(default=False),
+        ),
+    ]
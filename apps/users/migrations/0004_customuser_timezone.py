@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:12
+
+import timezone_field.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_customuser_reminder_digest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="timezone",
+            field=timezone_field.fields.TimeZoneField(default="UTC"),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from timezone_field import TimeZoneField
 from .managers import CustomUserManager
 
 
@@ -7,11 +8,23 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    reminder_digest = models.BooleanField(default=False)
+    timezone = TimeZoneField(default='UTC')
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='user_deleted_at_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.email
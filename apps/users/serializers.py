@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from timezone_field.rest_framework import TimeZoneSerializerField
 from .models import CustomUser
 
 
@@ -35,3 +36,12 @@ class UserLoginSerializer(serializers.Serializer):
         else:
             raise serializers.ValidationError('Must include "email" and "password".')
         return data
+
+
+class UserSettingsSerializer(serializers.ModelSerializer):
+    timezone = TimeZoneSerializerField(required=False)
+
+    class Meta:
+        model = CustomUser
+        fields = ['email', 'reminder_digest', 'timezone']
+        read_only_fields = ['email']
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_auth_user
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_auth_user(sender, instance, **kwargs):
+    """Drop the cached user so password, is_active and other changes apply to the next request."""
+    invalidate_auth_user(instance.pk)
@@ -1,8 +1,19 @@
 import pytest
+from types import SimpleNamespace
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.authentication import CachedJWTAuthentication, get_auth_user_cache_key
+from apps.users.throttling import SlidingWindowThrottle, get_throttle_rejections
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
 
 
 @pytest.fixture
@@ -102,3 +113,198 @@ class TestAuthAPI:
         response = api_client.post(login_url, user_data)
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestUserSettings:
+    @pytest.fixture
+    def settings_url(self):
+        return reverse('users:settings')
+
+    def test_enable_reminder_digest(self, api_client, settings_url, test_user):
+        api_client.force_authenticate(user=test_user)
+
+        response = api_client.patch(settings_url, {'reminder_digest': True})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            'email': test_user.email, 'reminder_digest': True, 'timezone': 'UTC'
+        }
+        test_user.refresh_from_db()
+        assert test_user.reminder_digest
+
+    def test_set_timezone(self, api_client, settings_url, test_user):
+        api_client.force_authenticate(user=test_user)
+
+        response = api_client.patch(settings_url, {'timezone': 'Europe/Kyiv'})
+        invalid = api_client.patch(settings_url, {'timezone': 'Mars/Olympus_Mons'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['timezone'] == 'Europe/Kyiv'
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+        test_user.refresh_from_db()
+        assert str(test_user.timezone) == 'Europe/Kyiv'
+
+    def test_settings_require_authentication(self, api_client, settings_url):
+        response = api_client.get(settings_url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """
+    Tests resolving JWT users through the cache.
+    """
+
+    @pytest.fixture
+    def authenticate(self, test_user):
+        token = RefreshToken.for_user(test_user).access_token
+        factory = APIRequestFactory()
+
+        def authenticate():
+            request = factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            return CachedJWTAuthentication().authenticate(request)
+        return authenticate
+
+    def test_user_is_loaded_from_cache_after_first_request(
+        self, authenticate, test_user, django_assert_num_queries
+    ):
+        with django_assert_num_queries(1):
+            authenticate()
+
+        with django_assert_num_queries(0):
+            user, _ = authenticate()
+
+        assert user == test_user
+
+    def test_cache_holds_no_password_hash(self, authenticate, test_user):
+        authenticate()
+
+        assert cache.get(get_auth_user_cache_key(test_user.id)) == {
+            'id': test_user.id,
+            'email': test_user.email,
+            'is_active': True,
+            'timezone': test_user.timezone,
+            'reminder_digest': False,
+        }
+
+    def test_settings_update_through_cached_user_keeps_password(
+        self, api_client, test_user, test_user_password
+    ):
+        token = RefreshToken.for_user(test_user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        settings_url = reverse('users:settings')
+        api_client.get(settings_url)
+
+        response = api_client.patch(settings_url, {'timezone': 'Europe/Kyiv'})
+        test_user.refresh_from_db()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert str(test_user.timezone) == 'Europe/Kyiv'
+        assert test_user.check_password(test_user_password)
+
+    def test_saving_user_invalidates_cache(self, authenticate, test_user):
+        authenticate()
+
+        test_user.is_active = False
+        test_user.save()
+
+        assert cache.get(get_auth_user_cache_key(test_user.id)) is None
+        with pytest.raises(AuthenticationFailed):
+            authenticate()
+
+    def test_deleted_user_is_not_served_from_cache(self, authenticate, test_user):
+        authenticate()
+
+        test_user.delete()
+
+        with pytest.raises(AuthenticationFailed):
+            authenticate()
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+    """
+    Tests sliding-window throttling of login and registration attempts.
+    """
+
+    @pytest.fixture(autouse=True)
+    def throttle_rates(self, settings):
+        settings.AUTH_THROTTLE_RATES = {
+            'login_ip': '3/min',
+            'login_email': '2/min',
+            'register_ip': '2/hour',
+            'register_email': '2/hour',
+        }
+        return settings.AUTH_THROTTLE_RATES
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = SimpleNamespace(now=1_000_000.0)
+        monkeypatch.setattr(SlidingWindowThrottle, 'timer', lambda self: clock.now)
+        return clock
+
+    def login(self, api_client, login_url, email, password='wrong_password', ip='10.0.0.1'):
+        return api_client.post(
+            login_url, {'email': email, 'password': password}, REMOTE_ADDR=ip
+        )
+
+    def test_login_is_throttled_per_ip(self, api_client, login_url):
+        responses = [
+            self.login(api_client, login_url, f'user{i}@example.com') for i in range(4)
+        ]
+
+        assert [response.status_code for response in responses] == [400, 400, 400, 429]
+        assert get_throttle_rejections('login_ip') == 1
+
+    def test_login_is_throttled_per_email_across_ips(self, api_client, login_url, test_user):
+        responses = [
+            self.login(api_client, login_url, test_user.email, ip=f'10.0.0.{i}') for i in range(3)
+        ]
+
+        assert responses[-1].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 'Retry-After' in responses[-1]
+        assert get_throttle_rejections('login_email') == 1
+
+    def test_email_throttle_ignores_case(self, api_client, login_url, test_user):
+        self.login(api_client, login_url, test_user.email.upper(), ip='10.0.0.1')
+        self.login(api_client, login_url, test_user.email, ip='10.0.0.2')
+
+        response = self.login(api_client, login_url, test_user.email.title(), ip='10.0.0.3')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_throttled_login_is_rejected_before_checking_password(
+        self, api_client, login_url, test_user, test_user_password, django_assert_num_queries
+    ):
+        for _ in range(2):
+            self.login(api_client, login_url, test_user.email)
+
+        with django_assert_num_queries(0):
+            response = self.login(api_client, login_url, test_user.email, test_user_password)
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_login_window_slides(self, api_client, login_url, test_user, test_user_password, clock):
+        self.login(api_client, login_url, test_user.email)
+        clock.now += 30
+        self.login(api_client, login_url, test_user.email)
+        clock.now += 31
+
+        allowed = self.login(api_client, login_url, test_user.email, test_user_password)
+        throttled = self.login(api_client, login_url, test_user.email, test_user_password)
+
+        assert allowed.status_code == status.HTTP_200_OK
+        assert throttled.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_registration_is_throttled_per_ip(self, api_client, register_url, test_user_password):
+        responses = [
+            api_client.post(
+                register_url, {'email': f'new{i}@example.com', 'password': test_user_password}
+            )
+            for i in range(3)
+        ]
+
+        assert [response.status_code for response in responses] == [201, 201, 429]
+        assert get_throttle_rejections('register_ip') == 1
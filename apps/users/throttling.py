@@ -0,0 +1,133 @@
+import logging
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log kept in a sorted set of request timestamps (in milliseconds).
+# Expired entries are trimmed, the window is counted and the request is recorded in one
+# atomic step, so concurrent attempts from many API workers cannot overshoot the limit.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, tonumber(oldest[2]) + window - now}
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, 0}
+"""
+
+_local_lock = threading.Lock()
+
+
+def _rejection_counter_key(scope):
+    return f'users:throttle-rejections:{scope}'
+
+
+def record_throttle_rejection(scope, ident):
+    """Count a throttled request per scope and log it."""
+    key = _rejection_counter_key(scope)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+    logger.warning('Throttled %s request from %s', scope, ident)
+
+
+def get_throttle_rejections(scope):
+    return cache.get(_rejection_counter_key(scope), 0)
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding-window throttle with rates taken from the AUTH_THROTTLE_RATES setting.
+
+    With the Redis cache backend the window is checked and updated by a Lua script;
+    other backends (locmem in tests and development) fall back to DRF's cache-based
+    history guarded by a process-local lock.
+    """
+    cache_format = 'users:throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches['default']
+
+    def get_rate(self):
+        return settings.AUTH_THROTTLE_RATES[self.scope]
+
+    def get_ident_value(self, request):
+        raise NotImplementedError('.get_ident_value() must be overridden')
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            return None
+        self.ident = ident
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        if not isinstance(self.cache, RedisCache):
+            with _local_lock:
+                return super().allow_request(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        client = self.cache._cache.get_client(self.key, write=True)
+        allowed, retry_after = client.eval(
+            SLIDING_WINDOW_SCRIPT, 1, self.cache.make_and_validate_key(self.key),
+            int(self.timer() * 1000), self.duration * 1000, self.num_requests, uuid.uuid4().hex
+        )
+        self.retry_after = retry_after / 1000
+        return True if allowed else self.throttle_failure()
+
+    def throttle_failure(self):
+        record_throttle_rejection(self.scope, self.ident)
+        return False
+
+    def wait(self):
+        if isinstance(self.cache, RedisCache):
+            return self.retry_after
+        return super().wait()
+
+
+class IPThrottle(SlidingWindowThrottle):
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    def get_ident_value(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return email.strip().lower() if isinstance(email, str) else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class RegisterEmailThrottle(EmailThrottle):
+    scope = 'register_email'
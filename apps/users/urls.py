@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import UserRegistrationView, UserLoginView
+from .views import UserRegistrationView, UserLoginView, UserSettingsView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 app_name = 'users'
@@ -8,4 +8,5 @@ urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('login/', UserLoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('me/', UserSettingsView.as_view(), name='settings'),
 ]
@@ -0,0 +1,138 @@
+"""
+Compare throughput of the synchronous DRF views (one worker thread per in-flight request,
+as under a threaded WSGI server) with the async views (one event loop, as under an ASGI
+server) for the dashboard, habit list and habit-log list at increasing concurrency.
+
+The dashboard cache is disabled so every request reaches PostgreSQL. The sync side opens one
+connection per thread, so keep the highest concurrency below PostgreSQL's max_connections.
+
+Usage (from the repository root, with the usual database environment variables set):
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+from .utils import benchmark_database, setup_django
+
+setup_django()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import AsyncRequestFactory, RequestFactory, override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.habits import async_views  # noqa: E402
+from apps.habits.models import Goal, Habit, HabitLog  # noqa: E402
+from apps.habits.views import HabitLogListCreateView, HabitViewSet  # noqa: E402
+
+ENDPOINTS = {
+    'dashboard': (
+        '/habits/habits/dashboard/',
+        HabitViewSet.as_view({'get': 'dashboard'}),
+        async_views.habit_dashboard,
+    ),
+    'habit list': (
+        '/habits/habits/',
+        HabitViewSet.as_view({'get': 'list'}),
+        async_views.habit_list,
+    ),
+    'habit-log list': (
+        '/habits/habit-logs/',
+        HabitLogListCreateView.as_view(),
+        async_views.habit_log_list,
+    ),
+}
+
+
+def run_sync(view, path, headers, total, concurrency):
+    """Serve `total` requests from `concurrency` threads, each with its own connection."""
+    factory = RequestFactory()
+    remaining = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            view(factory.get(path, headers=headers)).render()
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return total / (time.perf_counter() - started)
+
+
+def run_async(view, path, headers, total, concurrency):
+    """Serve `total` requests from `concurrency` tasks on a single event loop."""
+    factory = AsyncRequestFactory()
+
+    async def main():
+        remaining = iter(range(total))
+
+        async def worker():
+            while next(remaining, None) is not None:
+                await view(factory.get(path, headers=headers))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await sync_to_async(connections.close_all)()
+        return total / elapsed
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--habits', type=int, default=20)
+    parser.add_argument('--logs', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    with benchmark_database(), override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    ):
+        user = get_user_model().objects.create_user(email='benchmark@example.com', password='x')
+        habits = Habit.objects.bulk_create(
+            Habit(user=user, name=f'Benchmark habit {i}', frequency='weekly')
+            for i in range(args.habits)
+        )
+        Goal.objects.bulk_create(Goal(habit=habit, target_streak=30) for habit in habits)
+        now = timezone.now()
+        HabitLog.objects.bulk_create(
+            (
+                HabitLog(
+                    habit=habits[i % len(habits)],
+                    user=user,
+                    completed_at=now - timedelta(minutes=i),
+                )
+                for i in range(args.logs)
+            ),
+            batch_size=5000,
+        )
+        connections['default'].close()
+
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+        print(f"{'endpoint':<16} {'concurrency':>11} {'sync req/s':>11} {'async req/s':>12}")
+        for name, (path, sync_view, async_view) in ENDPOINTS.items():
+            for concurrency in args.concurrency:
+                sync_rps = run_sync(sync_view, path, headers, args.requests, concurrency)
+                async_rps = run_async(async_view, path, headers, args.requests, concurrency)
+                print(f'{name:<16} {concurrency:>11} {sync_rps:>11.1f} {async_rps:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
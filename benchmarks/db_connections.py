@@ -0,0 +1,82 @@
+"""
+Compare per-request latency of the habit list under the DB_CONN_MODE connection modes:
+a new connection per request (close), a persistent health-checked connection
+(persistent) and psycopg's connection pool (pool).
+
+Each request goes through the same connection bookkeeping as Django's request handler
+(close_old_connections() when the request starts and finishes).
+
+Usage (from the repository root, with the usual database environment variables set):
+
+    python -m benchmarks.db_connections --requests 500
+"""
+import argparse
+import statistics
+import time
+
+from .utils import benchmark_database, setup_django
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import close_old_connections, connections  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from apps.habits.models import Habit  # noqa: E402
+from apps.habits.views import HabitViewSet  # noqa: E402
+
+MODES = {
+    'close': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': {}},
+    'pool': {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pool': {'min_size': 2, 'max_size': 4}},
+    },
+}
+
+
+def measure(view, request, total):
+    timings = []
+    for _ in range(total):
+        started = time.perf_counter()
+        close_old_connections()
+        view(request).render()
+        close_old_connections()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        user = get_user_model().objects.create_user(email='benchmark@example.com', password='x')
+        Habit.objects.bulk_create(
+            Habit(user=user, name=f'Benchmark habit {i}') for i in range(20)
+        )
+        request = APIRequestFactory().get('/habits/habits/')
+        force_authenticate(request, user=user)
+        view = HabitViewSet.as_view({'get': 'list'})
+
+        connection = connections['default']
+        original = {key: connection.settings_dict[key] for key in MODES['close']}
+
+        print(f"{'mode':<12} {'median ms':>10} {'p95 ms':>8}")
+        try:
+            for mode, options in MODES.items():
+                connection.close()
+                connection.settings_dict.update(options)
+                timings = measure(view, request, args.requests)
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                print(f'{mode:<12} {statistics.median(timings):>10.2f} {p95:>8.2f}')
+        finally:
+            connection.close()
+            connection.close_pool()
+            connection.settings_dict.update(original)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare habit-log list latency at increasing page depth for cursor and offset pagination.
+The logs are spread over `--users` users, so the list query has to pick out the logs of
+the benchmarked user as in production.
+
+Usage (from the repository root, with the usual database environment variables set):
+
+    python -m benchmarks.pagination --logs 200000 --users 20 --page-size 50
+"""
+import argparse
+from datetime import timedelta
+
+from .utils import benchmark_database, median_ms, setup_django
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.pagination import LimitOffsetPagination  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from apps.habits.models import Habit, HabitLog  # noqa: E402
+from apps.habits.views import HabitLogListCreateView  # noqa: E402
+
+
+class OffsetHabitLogListView(HabitLogListCreateView):
+    pagination_class = LimitOffsetPagination
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logs', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        users = [
+            get_user_model().objects.create_user(email=f'benchmark{i}@example.com', password='x')
+            for i in range(args.users)
+        ]
+        habits = [
+            Habit.objects.create(user=user, name='Benchmark habit', frequency='weekly')
+            for user in users
+        ]
+        user = users[0]
+        now = timezone.now()
+        HabitLog.objects.bulk_create(
+            (
+                HabitLog(
+                    habit=habits[i % args.users],
+                    user=users[i % args.users],
+                    completed_at=now - timedelta(minutes=i),
+                )
+                for i in range(args.logs)
+            ),
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE habits_habitlog')
+
+        factory = APIRequestFactory()
+        cursor_view = HabitLogListCreateView.as_view()
+        offset_view = OffsetHabitLogListView.as_view()
+
+        def get(view, url):
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+            return view(request)
+
+        page_count = args.logs // args.users // args.page_size
+        checkpoints = sorted({1, 10, 100, 1000, page_count} & set(range(1, page_count + 1)))
+
+        print(f"{'page':>8} {'cursor ms':>10} {'offset ms':>10}")
+        url = f'/habits/habit-logs/?page_size={args.page_size}'
+        for page in range(1, checkpoints[-1] + 1):
+            if page in checkpoints:
+                offset = (page - 1) * args.page_size
+                offset_url = f'/habits/habit-logs/?limit={args.page_size}&offset={offset}'
+                cursor_ms = median_ms(lambda: get(cursor_view, url), args.repeat)
+                offset_ms = median_ms(lambda: get(offset_view, offset_url), args.repeat)
+                print(f'{page:>8} {cursor_ms:>10.2f} {offset_ms:>10.2f}')
+            url = get(cursor_view, url).data['next']
+
+
+if __name__ == '__main__':
+    main()
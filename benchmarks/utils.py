@@ -0,0 +1,38 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habit_tracker.settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the benchmark against a throwaway test database so it never touches real data.
+    """
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def median_ms(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
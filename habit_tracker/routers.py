@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def start_replica_reads():
+    """Send reads to the replica (see ReplicaRouter) until stop_replica_reads() is called."""
+    return _replica_reads.set(True)
+
+
+def stop_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+def _recent_write_key(user_id):
+    return f'db:recent-write:{user_id}'
+
+
+def mark_recent_write(user_id):
+    """Keep the user's reads on the primary for REPLICA_STICKY_SECONDS after a write."""
+    cache.set(_recent_write_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def has_recent_write(user_id):
+    return cache.get(_recent_write_key(user_id), False)
+
+
+class ReplicaRouter:
+    """
+    Route reads made within replica_reads() to REPLICA_DATABASE_ALIAS; everything else,
+    including every write and reads inside a transaction, goes to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if alias and _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
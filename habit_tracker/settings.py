@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 from datetime import timedelta
 from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -102,6 +103,59 @@ DATABASES = {
     }
 }
 
+# Connection management:
+# - close: a new connection for every request or task
+# - persistent: connections are reused for DB_CONN_MAX_AGE seconds and health-checked
+# - pool: psycopg's connection pool of DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections,
+#   health-checked when handed out
+# Celery processes (DJANGO_PROCESS_ROLE=worker) prefer the CELERY_-prefixed variables.
+DJANGO_PROCESS_ROLE = os.getenv('DJANGO_PROCESS_ROLE', 'web')
+
+
+def _db_env(name, default):
+    if DJANGO_PROCESS_ROLE == 'worker':
+        return os.getenv(f'CELERY_{name}', os.getenv(name, default))
+    return os.getenv(name, default)
+
+
+DB_CONN_MODE = _db_env('DB_CONN_MODE', 'close')
+
+if DB_CONN_MODE == 'persistent':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(_db_env('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+elif DB_CONN_MODE == 'pool':
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(_db_env('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(_db_env('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(_db_env('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+elif DB_CONN_MODE != 'close':
+    raise ImproperlyConfigured(
+        f"DB_CONN_MODE must be 'close', 'persistent' or 'pool', not {DB_CONN_MODE!r}"
+    )
+
+# Read replica serving safe requests of the habit API; without DB_REPLICA_HOST the alias
+# exists (as a test mirror of default) but the router keeps every query on default.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+    'PORT': os.getenv('DB_REPLICA_PORT') or DATABASES['default']['PORT'],
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['habit_tracker.routers.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica' if DB_REPLICA_HOST else None
+
+# Seconds a user's reads stay on the primary after they write, so they see their own changes
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -145,14 +199,43 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Cache settings
+# Redis in production, process-local memory when no Redis URL is configured (e.g. tests)
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    } if REDIS_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a rendered dashboard stays cached; entries are also invalidated on every change
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 24 * 60 * 60))
+
+
+# Maximum number of entries accepted by the bulk habit log sync endpoint
+HABIT_LOG_SYNC_MAX_ITEMS = int(os.getenv('HABIT_LOG_SYNC_MAX_ITEMS', 500))
+
+# Number of habit log rows fetched per round trip when streaming exports
+HABIT_LOG_EXPORT_CHUNK_SIZE = int(os.getenv('HABIT_LOG_EXPORT_CHUNK_SIZE', 2000))
+
+# Serve the dashboard, habit list and habit log list with async views (for ASGI servers)
+HABITS_ASYNC_VIEWS = os.getenv('HABITS_ASYNC_VIEWS', 'False') == 'True'
+
+
 # Set Rest_framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'apps.habits.pagination.HabitCursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
 }
 
 # Set settings for JWT Authentication
@@ -160,6 +243,17 @@ REST_FRAMEWORK = {
 ACCESS_TOKEN_MINUTES = int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME'))
 REFRESH_TOKEN_DAYS = int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME'))
 
+# Seconds an authenticated user is served from the cache before being reloaded
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# Sliding-window limits for login and registration attempts, per client IP and per email
+AUTH_THROTTLE_RATES = {
+    'login_ip': os.getenv('LOGIN_IP_THROTTLE_RATE', '20/min'),
+    'login_email': os.getenv('LOGIN_EMAIL_THROTTLE_RATE', '5/min'),
+    'register_ip': os.getenv('REGISTER_IP_THROTTLE_RATE', '10/hour'),
+    'register_email': os.getenv('REGISTER_EMAIL_THROTTLE_RATE', '3/hour'),
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=ACCESS_TOKEN_MINUTES),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=REFRESH_TOKEN_DAYS),
@@ -184,10 +278,55 @@ CELERY_BEAT_SCHEDULE = {
     },
     'reset-inactive-habit-streaks': {
         'task': 'apps.habits.tasks.reset_streaks_for_inactive_habits',
-        'schedule': crontab(minute='1', hour='0'),
+        'schedule': crontab(minute='1'),
+    },
+    'sync-reminder-utc-minutes': {
+        'task': 'apps.habits.tasks.sync_reminder_utc_minutes',
+        'schedule': crontab(minute='*/15'),
+    },
+    'prune-reminder-dispatches': {
+        'task': 'apps.habits.tasks.prune_reminder_dispatches',
+        'schedule': crontab(minute='45', hour='0'),
+    },
+    'manage-habit-log-partitions': {
+        'task': 'apps.habits.tasks.manage_habit_log_partitions',
+        'schedule': crontab(minute='30', hour='0'),
+    },
+    'resume-purges': {
+        'task': 'apps.habits.tasks.resume_purges',
+        'schedule': crontab(minute='15'),
     },
 }
 
+# Number of goal-id range shards the nightly streak reset is split into
+STREAK_RESET_SHARDS = int(os.getenv('STREAK_RESET_SHARDS', 4))
+# Number of goals updated per statement by each streak reset shard
+STREAK_RESET_CHUNK_SIZE = int(os.getenv('STREAK_RESET_CHUNK_SIZE', 1000))
+
+# Monthly partitioning of the habit log table (convert with manage_habit_log_partitions --convert)
+HABIT_LOG_PARTITIONING = os.getenv('HABIT_LOG_PARTITIONING', 'False') == 'True'
+# Number of future monthly partitions kept ready
+HABIT_LOG_PARTITION_MONTHS_AHEAD = int(os.getenv('HABIT_LOG_PARTITION_MONTHS_AHEAD', 3))
+# Partitions older than this many months are detached (0 keeps every partition)
+HABIT_LOG_RETENTION_MONTHS = int(os.getenv('HABIT_LOG_RETENTION_MONTHS', 0))
+# Drop expired partitions instead of leaving them detached for archiving
+HABIT_LOG_DROP_EXPIRED_PARTITIONS = (
+    os.getenv('HABIT_LOG_DROP_EXPIRED_PARTITIONS', 'False') == 'True'
+)
+
+# Rows deleted per statement when purging a soft-deleted habit or user
+HABIT_PURGE_BATCH_SIZE = int(os.getenv('HABIT_PURGE_BATCH_SIZE', 1000))
+# Batches a purge task runs before queuing itself again
+HABIT_PURGE_MAX_BATCHES = int(os.getenv('HABIT_PURGE_MAX_BATCHES', 50))
+# Minutes after which unfinished purges are queued again by the resume-purges task
+HABIT_PURGE_RESUME_AFTER = int(os.getenv('HABIT_PURGE_RESUME_AFTER', 60))
+
 
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+# Recipients per SendGrid request when sending reminders (SendGrid allows up to 1000)
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+# How far back the reminder dispatcher catches up on minutes missed while it was not running
+REMINDER_MAX_CATCH_UP_MINUTES = int(os.getenv('REMINDER_MAX_CATCH_UP_MINUTES', 60))
+# Days the record of sent reminders is kept for
+REMINDER_DISPATCH_RETENTION_DAYS = int(os.getenv('REMINDER_DISPATCH_RETENTION_DAYS', 7))